@@ -1 +1,5 @@
-from .api import make_api_request
\ No newline at end of file
+from .api import make_api_request, fetch_movies_by_id, extract_plot, \
+    circuit_breaker, negative_cache
+from .async_api import make_api_request_async, fetch_movies_by_id_async
+from .search import search_movies_async, rank_results, search_cache
+from .resilience import CircuitBreaker, NegativeCache
@@ -1,16 +1,159 @@
 import requests
 import os
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from api.resilience import CircuitBreaker, NegativeCache
 
-load_dotenv()
+DEFAULT_OMDB_URL = "http://www.omdbapi.com/"
+# Failed lookups are not repeated for this many seconds
+NOT_FOUND_TTL = 300
+ERROR_TTL = 30
+PROBE_IMDB_ID = "tt0068646"
+REQUEST_TIMEOUT = 5
 
-API_KEY = os.getenv('API_KEY')
+
+def omdb_url():
+    """
+    Base URL of the OMDb API, overridable with OMDB_URL (e.g. to point
+    at a local stand-in).
+
+    Returns:
+        str: URL ending in '/'.
+    """
+    return os.getenv('OMDB_URL', DEFAULT_OMDB_URL)
+
+
+def request_url(query, by_id, api_key, page=1):
+    """
+    Build the OMDb URL for a title search or an IMDb ID lookup.
+
+    Args:
+        query (str): The title keyword or IMDb ID.
+        by_id (bool): If True, looks up an IMDb ID.
+        api_key (str): OMDb API key.
+        page (int): Page of title search results.
+
+    Returns:
+        str: Request URL.
+    """
+    if by_id:
+        return f"{omdb_url()}?apikey={api_key}&i={query}&plot=short"
+    if page > 1:
+        return f"{omdb_url()}?apikey={api_key}&s={query}&page={page}"
+    return f"{omdb_url()}?apikey={api_key}&s={query}"
+
+
+def probe_omdb():
+    """
+    Check whether OMDb answers at all, with a short timeout.
+
+    Returns:
+        bool: True if OMDb responded without a server error.
+    """
+    response = requests.get(
+        request_url(PROBE_IMDB_ID, True, os.getenv('API_KEY')),
+        timeout=2)
+    return response.status_code < 500
+
+
+circuit_breaker = CircuitBreaker(probe_omdb, name="OMDb API")
+negative_cache = NegativeCache()
+
+
+def prepare_request(query, by_id, page=1):
+    """
+    Decide whether a lookup should be sent to OMDb at all.
+
+    Args:
+        query (str): The title keyword or IMDb ID.
+        by_id (bool): If True, looks up an IMDb ID.
+        page (int): Page of title search results.
+
+    Returns:
+        tuple: (url, cache_key), or None if the lookup should be
+        skipped because of a missing key, a recent failure or an open
+        circuit.
+    """
+    api_key = os.getenv('API_KEY')
+    if not api_key:
+        print("Error: API_KEY is not set. Please check your .env file.")
+        return None
+
+    cache_key = (by_id, query.strip().lower(), page)
+    if cache_key in negative_cache:
+        return None
+    if not circuit_breaker.allow():
+        print("Error: OMDb API is unavailable. Try again later.")
+        return None
+    return request_url(query, by_id, api_key, page), cache_key
+
+
+def handle_response(response, cache_key):
+    """
+    Turn an OMDb HTTP response into movie data and record the outcome.
+
+    Args:
+        response: requests or httpx response.
+        cache_key (tuple): Key returned by prepare_request.
+
+    Returns:
+        dict: The OMDb answer if it found something, otherwise None.
+    """
+    if response.status_code >= 500:
+        circuit_breaker.record_failure()
+    elif response.status_code != 200:
+        circuit_breaker.record_success()
+    if response.status_code == 200:
+        # A body that does not parse raises, and the caller records
+        # the failure; only a readable answer counts as a success
+        data = response.json()
+        circuit_breaker.record_success()
+        if data.get("Response") == "True":
+            return data
+        print("No results found:", data.get("Error"))
+        negative_cache.add(cache_key, NOT_FOUND_TTL)
+        return None
+
+    print("Error:", response.status_code, response.text)
+    negative_cache.add(cache_key, ERROR_TTL)
+    return None
+
+
+def search_results(data, by_id):
+    """
+    Pick what make_api_request returns from an OMDb answer.
+
+    Args:
+        data (dict): Answer from handle_response, or None.
+        by_id (bool): If True, the lookup was by IMDb ID.
+
+    Returns:
+        dict or list: Details for an ID lookup, the first page of
+        results for a title search, or None.
+    """
+    if data is None or by_id:
+        return data
+    return data.get("Search", [])
+
+
+def handle_failure(cache_key):
+    """
+    Record a request that never got a response.
+
+    Args:
+        cache_key (tuple): Key returned by prepare_request.
+    """
+    circuit_breaker.record_failure()
+    negative_cache.add(cache_key, ERROR_TTL)
 
 
 def make_api_request(query, by_id=False):
     """
     Request movie data from OMDb API based on title or IMDb ID.
 
+    Returns None without a request while OMDb is failing (see
+    circuit_breaker) or when the same lookup failed recently (see
+    negative_cache).
+
     Args:
         query (str): The title keyword or IMDb ID to search for.
         by_id (bool): If True, searches using IMDb ID.
@@ -19,31 +162,14 @@ def make_api_request(query, by_id=False):
     Returns:
         dict: JSON response with movie data or None if there's an error.
     """
-    if not API_KEY:
-        print("Error: API_KEY is not set. Please check your .env file.")
+    prepared = prepare_request(query, by_id)
+    if prepared is None:
         return None
-
-    if by_id:
-        api_url = (f"http://www.omdbapi.com/?apikey={API_KEY}&"
-                   f"i={query}&plot=short")
-    else:
-        api_url = (f"http://www.omdbapi.com/?apikey={API_KEY}&"
-                   f"s={query}")
+    api_url, cache_key = prepared
 
     try:
-        response = requests.get(api_url, timeout=5)
-        if response.status_code == requests.codes.ok:
-            data = response.json()
-            if data.get("Response") == "True":
-                if by_id:
-                    return data
-                return data.get("Search", [])
-            else:
-                print("No results found:", data.get("Error"))
-                return None
-        else:
-            print("Error:", response.status_code, response.json())
-            return None
+        response = requests.get(api_url, timeout=REQUEST_TIMEOUT)
+        return search_results(handle_response(response, cache_key), by_id)
     except requests.exceptions.Timeout:
         print("Error: The request timed out. Try again later.")
     except requests.exceptions.ConnectionError:
@@ -52,4 +178,44 @@ def make_api_request(query, by_id=False):
     except requests.exceptions.RequestException as e:
         print("Error:", e)
 
+    handle_failure(cache_key)
     return None
+
+
+def extract_plot(movie_data):
+    """
+    Read the plot from OMDb movie details.
+
+    Args:
+        movie_data (dict): Details returned for an IMDb ID.
+
+    Returns:
+        str: The plot, or None if OMDb has none.
+    """
+    plot = (movie_data or {}).get("Plot")
+    return plot if plot and plot != "N/A" else None
+
+
+def fetch_movies_by_id(imdb_ids, max_workers=8):
+    """
+    Request details for many IMDb IDs concurrently.
+
+    Args:
+        imdb_ids (iterable): IMDb IDs to look up. Duplicates are
+                             requested only once.
+        max_workers (int): Maximum number of parallel requests.
+
+    Returns:
+        dict: Movie data keyed by IMDb ID, for the IDs found.
+    """
+    unique_ids = list(dict.fromkeys(imdb_ids))
+    if not unique_ids:
+        return {}
+
+    with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(unique_ids))) as pool:
+        results = pool.map(
+            lambda imdb_id: make_api_request(imdb_id, by_id=True),
+            unique_ids)
+        return {imdb_id: data for imdb_id, data in
+                zip(unique_ids, results) if data}
@@ -0,0 +1,95 @@
+import asyncio
+import httpx
+from api.api import prepare_request, handle_response, handle_failure, \
+    search_results, REQUEST_TIMEOUT
+
+
+async def request_omdb_async(query, by_id=False, page=1, client=None):
+    """
+    Send one OMDb request without blocking the event loop.
+
+    Shares the circuit breaker and negative cache of make_api_request.
+
+    Args:
+        query (str): The title keyword or IMDb ID to search for.
+        by_id (bool): If True, searches using IMDb ID.
+        page (int): Page of title search results.
+        client (httpx.AsyncClient, optional): Client to reuse; a
+            temporary one is opened if omitted.
+
+    Returns:
+        dict: The whole OMDb answer, or None if nothing was found.
+    """
+    prepared = prepare_request(query, by_id, page)
+    if prepared is None:
+        return None
+    api_url, cache_key = prepared
+
+    try:
+        if client is None:
+            async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
+                response = await client.get(api_url)
+        else:
+            response = await client.get(api_url)
+        return handle_response(response, cache_key)
+    except httpx.TimeoutException:
+        print("Error: The request timed out. Try again later.")
+    except httpx.TransportError:
+        print("Error: Failed to connect to OMDb API. "
+              "Check your internet connection.")
+    except httpx.HTTPError as e:
+        print("Error:", e)
+    except ValueError as e:
+        # A body that is not JSON, e.g. an error page from a proxy
+        print("Error: Invalid response from OMDb API:", e)
+
+    handle_failure(cache_key)
+    return None
+
+
+async def make_api_request_async(query, by_id=False, client=None):
+    """
+    Request movie data from OMDb API without blocking the event loop.
+
+    Behaves like make_api_request.
+
+    Args:
+        query (str): The title keyword or IMDb ID to search for.
+        by_id (bool): If True, searches using IMDb ID.
+        client (httpx.AsyncClient, optional): Client to reuse.
+
+    Returns:
+        dict: JSON response with movie data or None if there's an error.
+    """
+    return search_results(
+        await request_omdb_async(query, by_id, client=client), by_id)
+
+
+async def fetch_movies_by_id_async(imdb_ids, max_concurrency=16):
+    """
+    Request details for many IMDb IDs concurrently on one client.
+
+    Args:
+        imdb_ids (iterable): IMDb IDs to look up. Duplicates are
+                             requested only once.
+        max_concurrency (int): Maximum number of requests in flight.
+
+    Returns:
+        dict: Movie data keyed by IMDb ID, for the IDs found.
+    """
+    unique_ids = list(dict.fromkeys(imdb_ids))
+    if not unique_ids:
+        return {}
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limits = httpx.Limits(max_connections=max_concurrency)
+    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT,
+                                 limits=limits) as client:
+        async def fetch(imdb_id):
+            async with semaphore:
+                return await make_api_request_async(imdb_id, by_id=True,
+                                                    client=client)
+
+        results = await asyncio.gather(*map(fetch, unique_ids))
+    return {imdb_id: data for imdb_id, data in zip(unique_ids, results)
+            if data}
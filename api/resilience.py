@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing service and probe it in the background.
+
+    After failure_threshold consecutive failures the circuit opens and
+    allow() returns False right away, so callers fail fast instead of
+    each waiting for a timeout. While it is open, a background thread
+    calls probe() every recovery_timeout seconds and closes the circuit
+    as soon as a probe succeeds. Request threads are never used as
+    probes.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+
+    def __init__(self, probe, failure_threshold=5, recovery_timeout=30,
+                 name="service"):
+        """
+        Initialize a closed circuit.
+
+        Args:
+            probe (callable): Returns True if the service is healthy.
+            failure_threshold (int): Consecutive failures that open
+                the circuit.
+            recovery_timeout (float): Seconds between probes while
+                open.
+            name (str): Service name used in log messages.
+        """
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.name = name
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._generation = 0
+
+    @property
+    def state(self):
+        """
+        str: CLOSED or OPEN.
+        """
+        return self._state
+
+    def allow(self):
+        """
+        Check whether a request may be sent.
+
+        Returns:
+            bool: False while the circuit is open.
+        """
+        return self._state == self.CLOSED
+
+    def record_success(self):
+        """
+        Record a request that reached a healthy service.
+        """
+        with self._lock:
+            self._failures = 0
+
+    def record_failure(self):
+        """
+        Record a failed request, opening the circuit if needed.
+        """
+        with self._lock:
+            self._failures += 1
+            if (self._state == self.OPEN
+                    or self._failures < self.failure_threshold):
+                return
+            self._state = self.OPEN
+            self._generation += 1
+            generation = self._generation
+        print(f"Error: {self.name} failed {self.failure_threshold} "
+              f"times in a row; pausing requests.")
+        threading.Thread(target=self._probe_until_recovered,
+                         args=(generation,), daemon=True).start()
+
+    def reset(self):
+        """
+        Close the circuit and stop any background probe.
+        """
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._generation += 1
+
+    def _probe_until_recovered(self, generation):
+        """
+        Probe the service until it recovers or the circuit is reset.
+
+        Args:
+            generation (int): Opening this thread belongs to.
+        """
+        while True:
+            time.sleep(self.recovery_timeout)
+            if self._generation != generation:
+                return
+            try:
+                healthy = self.probe()
+            except Exception:
+                healthy = False
+            if healthy:
+                with self._lock:
+                    if self._generation == generation:
+                        self._state = self.CLOSED
+                        self._failures = 0
+                        self._generation += 1
+                print(f"{self.name} recovered; resuming requests.")
+                return
+
+
+class NegativeCache:
+    """
+    Remember failed lookups for a short time.
+
+    Keeps at most maxsize keys; the oldest are dropped first.
+    """
+
+    def __init__(self, maxsize=1024):
+        """
+        Initialize an empty cache.
+
+        Args:
+            maxsize (int): Maximum number of remembered keys.
+        """
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._expiry = OrderedDict()
+
+    def add(self, key, ttl):
+        """
+        Remember a failed lookup.
+
+        Args:
+            key (hashable): Lookup that failed.
+            ttl (float): Seconds to remember it.
+        """
+        with self._lock:
+            self._expiry.pop(key, None)
+            self._expiry[key] = time.monotonic() + ttl
+            while len(self._expiry) > self.maxsize:
+                self._expiry.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            expiry = self._expiry.get(key)
+            if expiry is None:
+                return False
+            if expiry <= time.monotonic():
+                del self._expiry[key]
+                return False
+            return True
+
+    def clear(self):
+        """
+        Forget every failed lookup.
+        """
+        with self._lock:
+            self._expiry.clear()
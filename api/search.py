@@ -0,0 +1,174 @@
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+import httpx
+from api.api import REQUEST_TIMEOUT
+from api.async_api import request_omdb_async
+
+# OMDb returns title search results ten at a time
+OMDB_PAGE_SIZE = 10
+SEARCH_TTL = 600
+
+
+def normalize_title(text):
+    """
+    Reduce a title to lower-case words for comparison.
+
+    Args:
+        text (str): Title or query.
+
+    Returns:
+        str: Words separated by single spaces.
+    """
+    return re.sub(r'[^0-9a-z]+', ' ', (text or '').casefold()).strip()
+
+
+def rank_results(query, results):
+    """
+    Order search results by how well their title matches the query.
+
+    Exact titles come first, then titles starting with the query,
+    then titles containing all of its words. Movies come before
+    series and episodes; otherwise OMDb's order is kept.
+
+    Args:
+        query (str): The search query.
+        results (list): OMDb search result dicts.
+
+    Returns:
+        list: The results, best match first.
+    """
+    wanted = normalize_title(query)
+    words = set(wanted.split())
+
+    def score(item):
+        position, result = item
+        title = normalize_title(result.get("Title"))
+        if title == wanted:
+            match = 0
+        elif title.startswith(wanted):
+            match = 1
+        elif words <= set(title.split()):
+            match = 2
+        else:
+            match = 3
+        return match, result.get("Type", "movie") != "movie", position
+
+    return [result for _, result in
+            sorted(enumerate(results), key=score)]
+
+
+class SearchCache:
+    """
+    Merged search results per query, kept for a limited time.
+
+    Holds at most maxsize queries; the least recently used are
+    dropped first.
+    """
+
+    def __init__(self, maxsize=256, ttl=SEARCH_TTL):
+        """
+        Initialize an empty cache.
+
+        Args:
+            maxsize (int): Maximum number of cached queries.
+            ttl (float): Seconds a result set stays valid.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """
+        Retrieve a cached result set.
+
+        Args:
+            key (str): Normalized query.
+
+        Returns:
+            tuple: The results, or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expiry, results = entry
+            if expiry <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return results
+
+    def set(self, key, results):
+        """
+        Store a result set.
+
+        Args:
+            key (str): Normalized query.
+            results (tuple): Merged, ranked results.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Drop every cached result set.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+search_cache = SearchCache()
+
+
+async def search_movies_async(query, max_pages=5):
+    """
+    Search OMDb across several result pages at once.
+
+    The first page tells how many results exist; the following pages
+    up to max_pages are then requested concurrently. Results are
+    merged, de-duplicated by IMDb ID, ranked against the query and
+    cached, so paging through them or repeating the search needs no
+    further requests.
+
+    Args:
+        query (str): The title keyword to search for.
+        max_pages (int): Maximum number of OMDb pages to read.
+
+    Returns:
+        tuple: OMDb search result dicts, best match first; empty if
+        nothing was found.
+    """
+    key = normalize_title(query)
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
+        first = await request_omdb_async(query, client=client)
+        if not first:
+            return ()
+        try:
+            total = int(first.get("totalResults", 0))
+        except ValueError:
+            total = 0
+        pages = min(max_pages, -(-total // OMDB_PAGE_SIZE))
+        rest = await asyncio.gather(*(
+            request_omdb_async(query, page=page, client=client)
+            for page in range(2, pages + 1)))
+
+    merged = {}
+    for data in (first, *rest):
+        for result in (data or {}).get("Search", []):
+            merged.setdefault(result.get("imdbID"), result)
+    results = tuple(rank_results(query, list(merged.values())))
+    # A page that failed would otherwise stay missing until expiry
+    if all(rest):
+        search_cache.set(key, results)
+    return results
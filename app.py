@@ -1,19 +1,325 @@
+import csv
+import io
+import json
+import mimetypes
 import os
-from flask import Flask, jsonify, flash, render_template, request, \
-    redirect, url_for
-from sqlalchemy.orm import joinedload
-from api import make_api_request
-from datamanager import Movie, User, SQLiteDataManager
+import re
+import threading
+import weakref
+from itertools import islice
+import click
+from flask import Flask, Blueprint, Response, jsonify, flash, \
+    render_template, request, redirect, url_for, stream_with_context, \
+    current_app, send_from_directory
+from werkzeug.local import LocalProxy
+from werkzeug.utils import secure_filename
+from sqlalchemy import create_engine
+from api import search_movies_async, fetch_movies_by_id_async, \
+    extract_plot
+from datamanager import SQLiteDataManager, InMemoryDataManager, \
+    ShardedDataManager, CachingDataManager, Catalog, SORT_OPTIONS
+from recommender import TasteIndex, Leaderboard
+from importer import CollectionImporter, iter_collection, \
+    detect_format, open_text
+from web import compress_response, choose_encoding, build_assets, \
+    load_manifest
 from dotenv import load_dotenv
 
-load_dotenv()
-app = Flask(__name__)
-API_KEY = os.getenv('API_KEY')
-app.secret_key = os.getenv('SECRET_KEY')
-data_manager = SQLiteDataManager("moviweb.db")
+# Every Resources instance, so fork handlers can reach their engines
+_resources = weakref.WeakSet()
 
 
-@app.route('/')
+class Resources:
+    """
+    Data manager, catalog and in-memory indexes of one application.
+
+    Nothing is opened until first use, so creating an application is
+    cheap. Connections inherited through fork() are discarded in the
+    child without closing them, leaving the parent's connections
+    intact; each worker then opens its own.
+    """
+
+    def __init__(self, config):
+        """
+        Initialize the resources from the application config.
+
+        Args:
+            config (dict): Application config.
+        """
+        self.config = config
+        self._lock = threading.Lock()
+        self._loaded = None
+        _resources.add(self)
+
+    def load(self):
+        """
+        Create the resources on first use.
+
+        Returns:
+            dict: 'data_manager', 'catalog', 'taste_index' and
+            'leaderboard'.
+        """
+        if self._loaded is None:
+            with self._lock:
+                if self._loaded is None:
+                    self._loaded = self._create()
+        return self._loaded
+
+    def _create(self):
+        """
+        Open the configured data manager and build the indexes.
+
+        Returns:
+            dict: The resources, keyed by name.
+        """
+        if self.config['DATA_MANAGER'] == 'memory':
+            backend = InMemoryDataManager()
+            catalog = Catalog(create_engine(
+                f"sqlite:///{self.config['CATALOG_DATABASE']}"))
+        elif self.config['DATA_MANAGER'] == 'sharded':
+            backend = ShardedDataManager(self.config['DATABASE'],
+                                         self.config['SHARD_COUNT'])
+            catalog = Catalog(backend.engine)
+        else:
+            backend = SQLiteDataManager(self.config['DATABASE'])
+            catalog = Catalog(backend.engine)
+        data_manager = CachingDataManager(
+            backend, maxsize=self.config['READ_CACHE_SIZE'])
+        return {
+            'data_manager': data_manager,
+            'catalog': catalog,
+            'taste_index': TasteIndex(data_manager),
+            'leaderboard': Leaderboard(data_manager),
+        }
+
+    def after_fork(self):
+        """
+        Drop pooled connections and locks inherited from the parent.
+        """
+        self._lock = threading.Lock()
+        if self._loaded is None:
+            return
+        data_manager = self._loaded['data_manager']
+        engines = [self._loaded['catalog'].engine,
+                   getattr(data_manager, 'engine', None)]
+        engines += [shard.engine for shard in
+                    getattr(data_manager, 'shards', ())]
+        for engine in dict.fromkeys(engines):
+            if engine is not None:
+                engine.dispose(close=False)
+
+
+def _after_fork_in_child():
+    """
+    Reset the resources of every application in a forked child.
+    """
+    for resources in list(_resources):
+        resources.after_fork()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _resource(name):
+    """
+    Proxy a resource of the current application.
+
+    Args:
+        name (str): Key returned by Resources.load().
+
+    Returns:
+        LocalProxy: Proxy resolving the resource on each access.
+    """
+    return LocalProxy(
+        lambda: current_app.extensions['moviweb'].load()[name])
+
+
+data_manager = _resource('data_manager')
+catalog = _resource('catalog')
+taste_index = _resource('taste_index')
+leaderboard = _resource('leaderboard')
+
+# Views and CLI commands, registered on every application by create_app()
+bp = Blueprint('main', __name__, cli_group=None)
+
+
+def collections_changed():
+    """
+    Mark in-memory indexes built from collections as outdated.
+    """
+    taste_index.invalidate()
+    leaderboard.invalidate()
+
+
+# Fingerprinted assets never change, so browsers may keep them a year
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def asset_manifest():
+    """
+    Retrieve the current application's static asset manifest.
+
+    Returns:
+        dict: Original to fingerprinted file names, loaded once.
+    """
+    extensions = current_app.extensions
+    if 'assets' not in extensions:
+        extensions['assets'] = load_manifest(current_app.static_folder)
+    return extensions['assets']
+
+
+def hashed_static_url(endpoint, values):
+    """
+    Point url_for('static', ...) at the fingerprinted build of a file.
+
+    Args:
+        endpoint (str): Endpoint being built.
+        values (dict): URL values, updated in place.
+    """
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = asset_manifest().get(values['filename'],
+                                                  values['filename'])
+
+
+def static_asset(filename):
+    """
+    Serve a static file.
+
+    Fingerprinted files are sent pre-compressed when the client
+    accepts it and marked immutable for a year; anything else is
+    served as usual.
+
+    Args:
+        filename (str): Path inside the static folder.
+
+    Returns:
+        Response: The file.
+    """
+    if filename not in asset_manifest().values():
+        return current_app.send_static_file(filename)
+
+    path = filename
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding and os.path.isfile(os.path.join(
+            current_app.static_folder,
+            filename + PRECOMPRESSED_SUFFIXES[encoding])):
+        path = filename + PRECOMPRESSED_SUFFIXES[encoding]
+    response = send_from_directory(
+        current_app.static_folder, path,
+        mimetype=mimetypes.guess_type(filename)[0],
+        max_age=ASSET_MAX_AGE)
+    if path != filename:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def compress_responses(response):
+    """
+    Compress buffered text responses the client accepts compressed.
+
+    Args:
+        response (Response): Response about to be sent.
+
+    Returns:
+        Response: The possibly compressed response.
+    """
+    return compress_response(response, request.accept_encodings,
+                             current_app.config['COMPRESS_MIN_SIZE'],
+                             current_app.config['COMPRESS_LEVEL'])
+
+
+SEARCH_PAGE_SIZE = 10
+MAX_PLOT_BATCH = 50
+# Stored for movies without a plot so they are not looked up again
+NO_PLOT = ''
+IMDB_ID_PATTERN = re.compile(r'tt\d+')
+
+
+def template_globals():
+    """
+    Values every template may use, whichever view renders it.
+
+    Returns:
+        dict: Template context additions.
+    """
+    return {'max_plot_batch': MAX_PLOT_BATCH}
+
+
+async def resolve_plots(imdb_ids):
+    """
+    Look plots up locally, fetching and storing the misses from OMDb.
+
+    Movies OMDb has no plot for are stored with an empty plot, so
+    each title is fetched at most once.
+
+    Args:
+        imdb_ids (list): IMDb IDs to resolve.
+
+    Returns:
+        dict: Plot keyed by IMDb ID, for the IDs that have one.
+    """
+    plots = data_manager.get_plots(imdb_ids)
+    misses = [imdb_id for imdb_id in imdb_ids if imdb_id not in plots]
+    if misses:
+        details = await fetch_movies_by_id_async(misses)
+        fetched = {imdb_id: extract_plot(movie_data) or NO_PLOT
+                   for imdb_id, movie_data in details.items()}
+        data_manager.save_plots(fetched)
+        plots.update(fetched)
+    return {imdb_id: plot for imdb_id, plot in plots.items() if plot}
+
+
+EXPORT_FIELDS = ('title', 'director', 'year', 'rating', 'imdb_id')
+EXPORT_BATCH_SIZE = 500
+
+
+def export_csv(rows):
+    """
+    Serialize movie rows as CSV, one chunk per batch of rows.
+
+    Args:
+        rows (iterable): Rows from iter_user_movies.
+
+    Yields:
+        str: CSV text chunks, starting with the header.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_ndjson(rows):
+    """
+    Serialize movie rows as newline-delimited JSON.
+
+    Args:
+        rows (iterable): Rows from iter_user_movies.
+
+    Yields:
+        str: One JSON document per line.
+    """
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row))) + "\n"
+
+
+EXPORT_FORMATS = {
+    'csv': (export_csv, 'text/csv'),
+    'ndjson': (export_ndjson, 'application/x-ndjson'),
+}
+
+
+@bp.route('/')
 def home():
     """
     Render the home page.
@@ -24,7 +330,7 @@ def home():
     return render_template('home.html')
 
 
-@app.route('/users', methods=['GET'])
+@bp.route('/users', methods=['GET'])
 def list_users():
     """
     Display a list of all users.
@@ -36,7 +342,7 @@ def list_users():
     return render_template('users.html', users=users)
 
 
-@app.route('/add_user', methods=['POST'])
+@bp.route('/add_user', methods=['POST'])
 def add_user():
     """
     Add a new user based on form input.
@@ -47,25 +353,19 @@ def add_user():
     user_name = request.form.get("name").strip()
     if not user_name:
         flash("Name is required to add a user.", "danger")
-        return redirect(url_for('list_users'))
+        return redirect(url_for('main.list_users'))
 
-    session = data_manager.Session()
-    try:
-        existing_user = session.query(User).filter(
-            User.name.ilike(user_name)).first()
-        if existing_user:
-            flash(f"User '{user_name}' already exists. Please "
-                  f"choose a different name.", "danger")
-            return redirect(url_for('list_users'))
+    if data_manager.get_user_by_name(user_name):
+        flash(f"User '{user_name}' already exists. Please "
+              f"choose a different name.", "danger")
+        return redirect(url_for('main.list_users'))
 
-        data_manager.add_user(user_name)
-        flash(f"User '{user_name}' added successfully.", "success")
-        return redirect(url_for('list_users'))
-    finally:
-        session.close()
+    data_manager.add_user(user_name)
+    flash(f"User '{user_name}' added successfully.", "success")
+    return redirect(url_for('main.list_users'))
 
 
-@app.route('/users/<int:user_id>/delete', methods=['POST'])
+@bp.route('/users/<int:user_id>/delete', methods=['POST'])
 def delete_user(user_id):
     """
     Delete a specific user from the database.
@@ -76,26 +376,34 @@ def delete_user(user_id):
     Returns:
         Response: Redirect to the user list page.
     """
-    session = data_manager.Session()
-    try:
-        user = session.query(User).filter(User.id == user_id).first()
-        if not user:
-            flash("User not found.", "danger")
-            return redirect(url_for('list_users'))
+    user = data_manager.get_user(user_id)
+    if not user:
+        flash("User not found.", "danger")
+        return redirect(url_for('main.list_users'))
 
-        session.delete(user)
-        session.commit()
+    if data_manager.delete_user(user_id):
+        collections_changed()
         flash(f"User '{user.name}' deleted successfully.", "success")
-    except Exception as e:
-        flash(f"An error occurred: {e}", "danger")
-        session.rollback()
-    finally:
-        session.close()
+    else:
+        flash("An error occurred while deleting the user.", "danger")
+
+    return redirect(url_for('main.list_users'))
+
+
+@bp.route('/popular', methods=['GET'])
+def popular_movies():
+    """
+    Display the site-wide most collected and highest rated movies.
 
-    return redirect(url_for('list_users'))
+    Returns:
+        str: Rendered HTML page with both leaderboards.
+    """
+    return render_template('popular.html',
+                           most_collected=leaderboard.most_collected(),
+                           highest_rated=leaderboard.highest_rated())
 
 
-@app.route('/users/<int:user_id>', methods=['GET'])
+@bp.route('/users/<int:user_id>', methods=['GET'])
 def user_movies(user_id):
     """
     Display movies of a specific user, with optional sorting
@@ -109,113 +417,157 @@ def user_movies(user_id):
         str: Rendered HTML page with the list of movies for
         the specified user.
     """
-    session = data_manager.Session()
     sort = request.args.get('sort', 'name_asc')
     search_query = request.args.get('search', '').strip().lower()
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 0, type=int)
+
+    user = data_manager.get_user(user_id)
+    if not user:
+        return render_template('error.html',
+                               message="User not found"), 404
+
+    if sort not in SORT_OPTIONS:
+        sort = 'name_asc'
+    page = max(page, 1)
+    # Fetch one extra movie to know whether there is a next page
+    limit = per_page + 1 if per_page > 0 else None
+    movies = data_manager.find_user_movies(
+        user_id, search_query, sort,
+        offset=(page - 1) * per_page if per_page > 0 else 0,
+        limit=limit)
+    has_next = limit is not None and len(movies) == limit
+
+    return render_template('user_movies.html', user=user,
+                           movies=movies[:per_page or None],
+                           api_key=current_app.config['API_KEY'], sort=sort,
+                           search=search_query, page=page,
+                           per_page=per_page, has_next=has_next)
+
+
+@bp.route('/users/<int:user_id>/stats', methods=['GET'])
+def user_stats(user_id):
+    """
+    Display statistics of a user's collection.
 
-    try:
-        user = session.query(User).options(
-            joinedload(User.movies)).filter(User.id == user_id).first()
-        if not user:
-            return render_template('error.html',
-                                   message="User not found"), 404
-
-        movies = [m for m in user.movies if search_query in
-                  m.name.lower() or search_query in
-                  m.director.lower()] if search_query else user.movies
-
-        if sort == 'name_asc':
-            movies = sorted(movies, key=lambda m: m.name.lower())
-        elif sort == 'name_desc':
-            movies = sorted(movies, key=lambda m: m.name.lower(),
-                            reverse=True)
-        elif sort == 'year_asc':
-            movies = sorted(movies, key=lambda m: m.year)
-        elif sort == 'year_desc':
-            movies = sorted(movies, key=lambda m: m.year,
-                            reverse=True)
-        elif sort == 'rating_asc':
-            movies = sorted(movies, key=lambda m: (m.rating or 0))
-        elif sort == 'rating_desc':
-            movies = sorted(movies, key=lambda m: (m.rating or 0),
-                            reverse=True)
-
-        return render_template('user_movies.html', user=user,
-                               movies=movies, api_key=API_KEY,
-                               sort=sort, search=search_query)
-    finally:
-        session.close()
-
-
-@app.route('/users/<int:user_id>/add_movie', methods=['GET'])
-def add_movie_form(user_id):
+    Args:
+        user_id (int): User's ID.
+
+    Returns:
+        str: Rendered HTML page with the user's statistics.
+    """
+    user = data_manager.get_user(user_id)
+    if not user:
+        flash("User not found.", "danger")
+        return redirect(url_for('main.list_users'))
+
+    stats = data_manager.get_user_stats(user_id)
+    return render_template('user_stats.html', user=user, stats=stats)
+
+
+@bp.route('/users/<int:user_id>/recommendations', methods=['GET'])
+def recommendations(user_id):
+    """
+    Display users with similar taste and movies they suggest.
+
+    Args:
+        user_id (int): User's ID.
+
+    Returns:
+        str: Rendered HTML page with similar users and suggestions.
+    """
+    user = data_manager.get_user(user_id)
+    if not user:
+        flash("User not found.", "danger")
+        return redirect(url_for('main.list_users'))
+
+    # Look up only the nearest neighbours, not every user
+    similar_users = []
+    for other_id, similarity in taste_index.similar_users(user_id):
+        other = data_manager.get_user(other_id)
+        if other:
+            similar_users.append((other, similarity))
+    return render_template('recommendations.html', user=user,
+                           similar_users=similar_users,
+                           suggestions=taste_index.recommend(user_id))
+
+
+@bp.route('/users/<int:user_id>/add_movie', methods=['GET'])
+async def add_movie_form(user_id):
     """
     Search for a movie to add to the user's list.
 
+    Several OMDb result pages are fetched and ranked at once; the
+    'page' query argument pages through that merged result set.
+
     Args:
         user_id (int): User's ID.
 
     Returns:
         Response: Renders search results for the user to select.
     """
-    session = data_manager.Session()
-    try:
-        user = session.query(User).options(
-            joinedload(User.movies)).filter(
-            User.id == user_id).first()
-        if not user:
-            flash("User not found.", "danger")
-            return redirect(url_for('list_users'))
-
-        search_query = request.args.get("title")
-        search_results = None
-
-        if search_query is None:
-            flash("Please enter a movie title to search.", "warning")
-            return render_template('user_movies.html',
-                                   user=user,
-                                   search_results=None,
-                                   search_query=None,
-                                   user_id=user_id,
-                                   api_key=API_KEY,
-                                   keep_modal_open=True)
-
-        if search_query.strip() == "":
-            flash("Please enter a movie title to search.", "warning")
-            return render_template('user_movies.html',
-                                   user=user,
-                                   search_results=None,
-                                   search_query=None,
-                                   user_id=user_id,
-                                   api_key=API_KEY,
-                                   keep_modal_open=True)
-
-        # Make the request to the API to search movies
-        search_results = make_api_request(search_query)
-        if not search_results:
-            flash(f"Movie '{search_query}' not found in OMDb.", "danger")
-            return render_template('user_movies.html',
-                                   user=user,
-                                   search_results=None,
-                                   search_query=None,
-                                   user_id=user_id,
-                                   api_key=API_KEY,
-                                   keep_modal_open=True)
+    user = data_manager.get_user(user_id)
+    if not user:
+        flash("User not found.", "danger")
+        return redirect(url_for('main.list_users'))
+
+    search_query = request.args.get("title")
+    page = max(request.args.get("page", 1, type=int), 1)
+    search_results = None
+
+    if search_query is None:
+        flash("Please enter a movie title to search.", "warning")
+        return render_template('user_movies.html',
+                               user=user,
+                               search_results=None,
+                               search_query=None,
+                               user_id=user_id,
+                               api_key=current_app.config['API_KEY'],
+                               keep_modal_open=True)
 
+    if search_query.strip() == "":
+        flash("Please enter a movie title to search.", "warning")
         return render_template('user_movies.html',
                                user=user,
-                               search_results=search_results,
-                               search_query=search_query,
+                               search_results=None,
+                               search_query=None,
                                user_id=user_id,
-                               api_key=API_KEY,
+                               api_key=current_app.config['API_KEY'],
                                keep_modal_open=True)
-    finally:
-        session.close()
 
+    # Make the request to the API to search movies, falling back
+    # to the local catalog when OMDb is unavailable
+    search_results = await search_movies_async(
+        search_query, current_app.config['SEARCH_MAX_PAGES'])
+    if not search_results:
+        search_results = catalog.search(search_query)
+    if not search_results:
+        flash(f"Movie '{search_query}' not found in OMDb.", "danger")
+        return render_template('user_movies.html',
+                               user=user,
+                               search_results=None,
+                               search_query=None,
+                               user_id=user_id,
+                               api_key=current_app.config['API_KEY'],
+                               keep_modal_open=True)
 
-@app.route('/users/<int:user_id>/confirm_add_movie',
-           methods=['POST'])
-def confirm_add_movie(user_id):
+    start = (page - 1) * SEARCH_PAGE_SIZE
+    return render_template('user_movies.html',
+                           user=user,
+                           search_results=search_results[
+                               start:start + SEARCH_PAGE_SIZE],
+                           search_query=search_query,
+                           search_page=page,
+                           has_more_results=len(search_results) >
+                           start + SEARCH_PAGE_SIZE,
+                           user_id=user_id,
+                           api_key=current_app.config['API_KEY'],
+                           keep_modal_open=True)
+
+
+@bp.route('/users/<int:user_id>/confirm_add_movie',
+          methods=['POST'])
+async def confirm_add_movie(user_id):
     """
     Add selected movies to the user's list.
 
@@ -225,66 +577,148 @@ def confirm_add_movie(user_id):
     Returns:
         Response: Redirects to user's movie list.
     """
-    session = data_manager.Session()
+    user = data_manager.get_user(user_id)
+    if not user:
+        flash("User not found.", "danger")
+        return redirect(url_for('main.list_users'))
+
+    imdb_ids = request.form.getlist("imdb_ids")
+    if not imdb_ids:
+        flash("Movie selection is required.", "danger")
+        return redirect(url_for('main.user_movies', user_id=user_id))
+
+    # Look every selected movie up at once instead of one by one,
+    # falling back to the local catalog when OMDb is unavailable
+    details = await fetch_movies_by_id_async(imdb_ids)
+    offline = catalog.lookup(imdb_id for imdb_id in imdb_ids
+                             if imdb_id not in details)
+    added_movies = []
+    plots = {}
+    for imdb_id in imdb_ids:
+        movie_data = details.get(imdb_id) or offline.get(imdb_id)
+        if movie_data and movie_data.get("Response") == "True":
+            title = movie_data.get("Title", "Unknown").title()
+            director = movie_data.get("Director", "Unknown")
+            year = movie_data.get("Year", None)
+            rating = movie_data.get("imdbRating", None)
+
+            # Handle NoneType values
+            year = int(year) if year and year.isdigit() else None
+            try:
+                rating = float(rating) if rating else None
+            except ValueError:
+                rating = None
+
+            if data_manager.has_movie(user_id, imdb_id, title):
+                flash(
+                    f"The movie '{title}' is already in your list.",
+                    "danger")
+                continue
+
+            data_manager.add_movie(user_id, title, director,
+                                   year, rating, imdb_id)
+            added_movies.append(title)
+            if imdb_id in details:
+                plots[imdb_id] = extract_plot(movie_data) or NO_PLOT
+
+    data_manager.save_plots(plots)
+
+    if added_movies:
+        collections_changed()
+        flash(
+            f"Movies '{', '.join(added_movies)}' added successfully.",
+            "success")
+    else:
+        flash("No new movies were added.", "danger")
+    return redirect(url_for('main.user_movies', user_id=user_id))
+
+
+@bp.route('/users/<int:user_id>/import', methods=['POST'])
+def import_movies(user_id):
+    """
+    Import a collection export (CSV, JSON or NDJSON) for a user.
+
+    The import runs within the request, so files with more than
+    IMPORT_MAX_ENTRIES entries are rejected; the import-collection
+    command is the way to import larger collections.
+
+    Args:
+        user_id (int): User's ID.
+
+    Returns:
+        Response: Redirects to user's movie list.
+    """
+    if not data_manager.get_user(user_id):
+        flash("User not found.", "danger")
+        return redirect(url_for('main.list_users'))
+
+    upload = request.files.get("collection")
+    if not upload or not upload.filename:
+        flash("Please choose a file to import.", "danger")
+        return redirect(url_for('main.user_movies', user_id=user_id))
+
+    max_entries = current_app.config['IMPORT_MAX_ENTRIES']
     try:
-        user = session.query(User).options(
-            joinedload(User.movies)).filter(
-            User.id == user_id).first()
-        if not user:
-            flash("User not found.", "danger")
-            return redirect(url_for('list_users'))
-
-        imdb_ids = request.form.getlist("imdb_ids")
-        if not imdb_ids:
-            flash("Movie selection is required.", "danger")
-            return redirect(url_for('user_movies', user_id=user_id))
-
-        added_movies = []
-        for imdb_id in imdb_ids:
-            movie_data = make_api_request(imdb_id, by_id=True)
-            if movie_data and movie_data.get("Response") == "True":
-                title = movie_data.get("Title", "Unknown").title()
-                director = movie_data.get("Director", "Unknown")
-                year = movie_data.get("Year", None)
-                rating = movie_data.get("imdbRating", None)
-
-                # Handle NoneType values
-                year = int(year) if year and year.isdigit() else None
-                try:
-                    rating = float(rating) if rating else None
-                except ValueError:
-                    rating = None
-
-                existing_movie = session.query(Movie).filter(
-                    Movie.user_id == user_id,
-                    (Movie.imdb_id == imdb_id) |
-                    (Movie.name.ilike(title))).first()
-
-                if existing_movie:
-                    flash(
-                        f"The movie '{title}' is already in your list.",
-                        "danger")
-                    continue
-
-                data_manager.add_movie(user_id, title, director,
-                                       year, rating, imdb_id)
-                added_movies.append(title)
-
-        if added_movies:
-            flash(
-                f"Movies '{', '.join(added_movies)}' added successfully.",
-                "success")
-        else:
-            flash("No new movies were added.", "danger")
-        return redirect(url_for('user_movies', user_id=user_id))
-    finally:
-        session.close()
+        # Read one entry past the limit to tell whether it is exceeded
+        entries = list(islice(iter_collection(
+            open_text(upload.stream), detect_format(upload.filename)),
+            max_entries + 1))
+        if len(entries) > max_entries:
+            flash(f"'{upload.filename}' has more than {max_entries} "
+                  f"movies. Import it with the 'flask import-collection' "
+                  f"command instead.", "danger")
+            return redirect(url_for('main.user_movies', user_id=user_id))
+        result = CollectionImporter(data_manager, catalog).run(
+            user_id, entries)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        flash(f"Could not read '{upload.filename}': {e}", "danger")
+        return redirect(url_for('main.user_movies', user_id=user_id))
+
+    if result.added:
+        collections_changed()
+    flash(f"Imported {result.added} of {result.processed} movies "
+          f"({result.duplicates} already in your list, "
+          f"{result.unresolved} not found).",
+          "success" if result.added else "warning")
+    return redirect(url_for('main.user_movies', user_id=user_id))
+
+
+@bp.route('/users/<int:user_id>/export', methods=['GET'])
+def export_movies(user_id):
+    """
+    Stream a user's collection as a CSV or NDJSON download.
 
+    Args:
+        user_id (int): User's ID.
 
-@app.route('/get_movie_plot/<imdb_id>', methods=['GET'])
-def get_movie_plot(imdb_id):
+    Returns:
+        Response: Streamed file, or a redirect if the user or format
+        is invalid.
     """
-    Fetch and return the plot of a movie from OMDb API.
+    file_format = request.args.get('format', 'csv')
+    if file_format not in EXPORT_FORMATS:
+        flash(f"Unsupported export format '{file_format}'.", "danger")
+        return redirect(url_for('main.user_movies', user_id=user_id))
+
+    user = data_manager.get_user(user_id)
+    if not user:
+        flash("User not found.", "danger")
+        return redirect(url_for('main.list_users'))
+
+    serialize, mimetype = EXPORT_FORMATS[file_format]
+    rows = data_manager.iter_user_movies(user_id, EXPORT_BATCH_SIZE)
+    filename = secure_filename(f"{user.name}-movies.{file_format}") \
+        or f"movies.{file_format}"
+    return Response(
+        stream_with_context(serialize(rows)), mimetype=mimetype,
+        headers={'Content-Disposition':
+                 f'attachment; filename="{filename}"'})
+
+
+@bp.route('/get_movie_plot/<imdb_id>', methods=['GET'])
+async def get_movie_plot(imdb_id):
+    """
+    Return the plot of a movie, from storage or from OMDb API.
 
     Args:
         imdb_id (str): IMDb ID of the movie.
@@ -293,18 +727,38 @@ def get_movie_plot(imdb_id):
         JSON: Plot of the movie.
     """
     try:
-        movie_data = make_api_request(imdb_id, by_id=True)
-        if movie_data and movie_data.get("Response") == "True":
-            plot = movie_data.get("Plot", "Plot not available.")
-            return jsonify({'plot': plot})
-        else:
-            return jsonify({'plot': "Plot not available."})
+        plot = (await resolve_plots([imdb_id])).get(imdb_id)
+        return jsonify({'plot': plot or "Plot not available."})
     except Exception as e:
         return jsonify({'plot': "An error occurred while fetching the plot."})
 
 
-@app.route('/users/<int:user_id>/update_movie/<int:movie_id>',
-           methods=['POST'])
+@bp.route('/plots', methods=['GET'])
+async def get_movie_plots():
+    """
+    Return the plots of many movies in one response.
+
+    The 'ids' query argument holds up to MAX_PLOT_BATCH comma-separated
+    IMDb IDs. Plots are read from storage first; misses are fetched
+    from OMDb concurrently and stored for next time.
+
+    Returns:
+        JSON: {'plots': {imdb_id: plot or null}}.
+    """
+    imdb_ids = list(dict.fromkeys(
+        imdb_id for imdb_id in request.args.get('ids', '').split(',')
+        if IMDB_ID_PATTERN.fullmatch(imdb_id)))
+    if len(imdb_ids) > MAX_PLOT_BATCH:
+        return jsonify({'error': f"At most {MAX_PLOT_BATCH} IDs "
+                                 f"per request."}), 400
+
+    plots = await resolve_plots(imdb_ids) if imdb_ids else {}
+    return jsonify({'plots': {imdb_id: plots.get(imdb_id)
+                              for imdb_id in imdb_ids}})
+
+
+@bp.route('/users/<int:user_id>/update_movie/<int:movie_id>',
+          methods=['POST'])
 def update_movie(user_id, movie_id):
     """
     Update an existing movie in the user's list.
@@ -316,55 +770,46 @@ def update_movie(user_id, movie_id):
     Returns:
         Response: Redirect to user's movie list.
     """
-    session = data_manager.Session()
-    try:
-        user = session.query(User).options(
-            joinedload(User.movies)).filter(User.id == user_id).first()
-        if not user:
-            flash("User not found.", "danger")
-            return redirect(url_for('list_users'))
-
-        movie = next((m for m in user.movies if m.id == movie_id), None)
-        if not movie:
-            flash("Movie not found.", "danger")
-            return redirect(url_for('user_movies', user_id=user_id))
-
-        title = request.form.get("title")
-        director = request.form.get("director")
-        year = request.form.get("year")
-        rating = request.form.get("rating")
-
-        if title:
-            movie.name = title
-        if director:
-            movie.director = director
-        if year:
-            try:
-                movie.year = int(year)
-            except ValueError:
-                flash("Invalid year value.", "danger")
-                return redirect(url_for('user_movies', user_id=user_id))
-
-        if rating:
-            try:
-                rating = float(rating)
-                if not 1.0 <= rating <= 10.0:
-                    raise ValueError("Rating must be between 1.0 and 10.0.")
-                movie.rating = rating
-            except ValueError:
-                flash("Rating must be a decimal between 1.0 and 10.0.",
-                      "danger")
-                return redirect(url_for('user_movies', user_id=user_id))
-
-        session.commit()
-        flash(f"Movie '{movie.name}' updated successfully.", "success")
-        return redirect(url_for('user_movies', user_id=user_id))
-    finally:
-        session.close()
-
-
-@app.route('/users/<int:user_id>/delete_movie/<int:movie_id>',
-           methods=['POST'])
+    if not data_manager.get_user(user_id):
+        flash("User not found.", "danger")
+        return redirect(url_for('main.list_users'))
+
+    movie = data_manager.get_movie(user_id, movie_id)
+    if not movie:
+        flash("Movie not found.", "danger")
+        return redirect(url_for('main.user_movies', user_id=user_id))
+
+    title = request.form.get("title")
+    director = request.form.get("director")
+    year = request.form.get("year")
+    rating = request.form.get("rating")
+
+    if year:
+        try:
+            year = int(year)
+        except ValueError:
+            flash("Invalid year value.", "danger")
+            return redirect(url_for('main.user_movies', user_id=user_id))
+
+    if rating:
+        try:
+            rating = float(rating)
+            if not 1.0 <= rating <= 10.0:
+                raise ValueError("Rating must be between 1.0 and 10.0.")
+        except ValueError:
+            flash("Rating must be a decimal between 1.0 and 10.0.",
+                  "danger")
+            return redirect(url_for('main.user_movies', user_id=user_id))
+
+    data_manager.update_movie(movie_id, title, director, year, rating)
+    collections_changed()
+    flash(f"Movie '{title or movie.name}' updated successfully.",
+          "success")
+    return redirect(url_for('main.user_movies', user_id=user_id))
+
+
+@bp.route('/users/<int:user_id>/delete_movie/<int:movie_id>',
+          methods=['POST'])
 def delete_movie(user_id, movie_id):
     """
     Delete a movie from the user's list.
@@ -376,21 +821,140 @@ def delete_movie(user_id, movie_id):
     Returns:
         Response: Redirect to user's movie list.
     """
-    session = data_manager.Session()
-    try:
-        movie = session.query(Movie).filter(
-            Movie.id == movie_id,
-            Movie.user_id == user_id).first()
-        if not movie:
-            flash("Movie not found.", "danger")
-            return redirect(url_for('user_movies', user_id=user_id))
-
-        session.delete(movie)
-        session.commit()
-        flash(f"Movie '{movie.name}' deleted successfully.", "success")
-        return redirect(url_for('user_movies', user_id=user_id))
-    finally:
-        session.close()
+    movie = data_manager.get_movie(user_id, movie_id)
+    if not movie:
+        flash("Movie not found.", "danger")
+        return redirect(url_for('main.user_movies', user_id=user_id))
+
+    data_manager.delete_movie(movie_id)
+    collections_changed()
+    flash(f"Movie '{movie.name}' deleted successfully.", "success")
+    return redirect(url_for('main.user_movies', user_id=user_id))
+
+
+@bp.cli.command('import-catalog')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', default=5000, show_default=True,
+              help='Number of rows inserted per batch.')
+@click.option('--all-types', is_flag=True,
+              help='Import every title type, not only movies.')
+def import_catalog(path, chunk_size, all_types):
+    """
+    Import an IMDb 'title.basics' TSV dump into the local catalog.
+
+    Args:
+        path (str): Path to a '.tsv' or '.tsv.gz' dump.
+        chunk_size (int): Number of rows inserted per batch.
+        all_types (bool): If True, keeps every title type.
+    """
+    kwargs = {'title_types': None} if all_types else {}
+    result = catalog.import_title_basics(
+        path, chunk_size=chunk_size,
+        progress=lambda n: click.echo(f"\rImported {n} titles...",
+                                      nl=False),
+        **kwargs)
+    click.echo(f"\nCatalog import finished: {result.imported} titles "
+               f"imported, {result.skipped} skipped.")
+
+
+@bp.cli.command('import-collection')
+@click.argument('user_id', type=int)
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format',
+              type=click.Choice(['csv', 'json']),
+              help='Export format; guessed from the extension if omitted.')
+@click.option('--batch-size', default=200, show_default=True,
+              help='Number of entries resolved and written together.')
+def import_collection(user_id, path, file_format, batch_size):
+    """
+    Import a collection export into a user's movie list.
+
+    Args:
+        user_id (int): ID of the user.
+        path (str): Path to a CSV, JSON or NDJSON export.
+        file_format (str): 'csv' or 'json'.
+        batch_size (int): Number of entries per batch.
+    """
+    if not data_manager.get_user(user_id):
+        raise click.ClickException(f"User {user_id} not found.")
+
+    importer = CollectionImporter(data_manager, catalog,
+                                  batch_size=batch_size)
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        entries = iter_collection(f, file_format or detect_format(path))
+        try:
+            result = importer.run(
+                user_id, entries,
+                progress=lambda r: click.echo(
+                    f"\rProcessed {r.processed}, added {r.added}...",
+                    nl=False))
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            raise click.ClickException(f"Could not read '{path}': {e}")
+    click.echo(f"\nImport finished: {result.added} added, "
+               f"{result.duplicates} duplicates, "
+               f"{result.unresolved} unresolved.")
+
+
+@bp.cli.command('build-assets')
+def build_static_assets():
+    """
+    Write fingerprinted, pre-compressed copies of the static files.
+    """
+    manifest = build_assets(current_app.static_folder)
+    click.echo(f"Built {len(manifest)} static assets.")
+
+
+@bp.cli.command('rebuild-stats')
+def rebuild_stats():
+    """
+    Recompute all collection statistics from the movies table.
+    """
+    users = data_manager.rebuild_stats()
+    click.echo(f"Rebuilt statistics for {users} users.")
+
+
+def create_app(config=None):
+    """
+    Create and configure an application.
+
+    Settings are read from the environment (and a .env file), then
+    overridden by config. Databases are opened lazily on first use.
+
+    Args:
+        config (dict, optional): Config values overriding the
+            environment, e.g. 'DATABASE' or 'DATA_MANAGER'.
+
+    Returns:
+        Flask: The configured application.
+    """
+    load_dotenv()
+    app = Flask(__name__)
+    app.config.from_mapping(
+        SECRET_KEY=os.getenv('SECRET_KEY'),
+        API_KEY=os.getenv('API_KEY'),
+        DATA_MANAGER=os.getenv('DATA_MANAGER', 'sqlite'),
+        DATABASE=os.getenv('DATABASE', 'moviweb.db'),
+        SHARD_COUNT=int(os.getenv('SHARD_COUNT', 4)),
+        CATALOG_DATABASE=os.getenv('CATALOG_DATABASE', 'catalog.db'),
+        READ_CACHE_SIZE=int(os.getenv('READ_CACHE_SIZE', 1024)),
+        COMPRESS_MIN_SIZE=int(os.getenv('COMPRESS_MIN_SIZE', 500)),
+        COMPRESS_LEVEL=int(os.getenv('COMPRESS_LEVEL', 6)),
+        SEARCH_MAX_PAGES=int(os.getenv('SEARCH_MAX_PAGES', 5)),
+        IMPORT_MAX_ENTRIES=int(os.getenv('IMPORT_MAX_ENTRIES', 200)),
+    )
+    if config:
+        app.config.from_mapping(config)
+    app.extensions['moviweb'] = Resources(app.config)
+
+    app.register_blueprint(bp)
+    app.view_functions['static'] = static_asset
+    app.url_defaults(hashed_static_url)
+    app.after_request(compress_responses)
+    app.context_processor(template_globals)
+    return app
+
+
+app = create_app()
 
 
 if __name__ == '__main__':
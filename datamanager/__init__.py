@@ -1,2 +1,8 @@
-from .data_manager_interface import DataManagerInterface
-from .sqlite_data_manager import Movie, User, SQLiteDataManager
\ No newline at end of file
+from .data_manager_interface import DataManagerInterface, SORT_OPTIONS
+from .sqlite_data_manager import Movie, User, CatalogTitle, \
+    SQLiteDataManager
+from .records import UserRecord, MovieRecord
+from .memory_data_manager import InMemoryDataManager
+from .sharded_data_manager import ShardedDataManager
+from .caching_data_manager import CachingDataManager, CacheInfo
+from .catalog import Catalog
@@ -0,0 +1,339 @@
+import threading
+from types import MappingProxyType
+from collections import OrderedDict, defaultdict, namedtuple
+from datamanager.data_manager_interface import DataManagerInterface
+from datamanager.records import UserRecord, MovieRecord
+
+CacheInfo = namedtuple(
+    "CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"])
+
+# Invalidation scopes that are not tied to a single user
+USERS = "users"
+POPULAR = "popular"
+
+
+def _user_record(user):
+    if user is None or isinstance(user, UserRecord):
+        return user
+    return UserRecord(user.id, user.name)
+
+
+def _movie_record(movie):
+    if movie is None or isinstance(movie, MovieRecord):
+        return movie
+    return MovieRecord(movie.id, movie.name, movie.director, movie.year,
+                       movie.rating, movie.user_id, movie.imdb_id)
+
+
+def _freeze(mapping):
+    """
+    Return a read-only copy of a dict, turning list values into tuples.
+    """
+    return MappingProxyType({
+        key: tuple(value) if isinstance(value, list) else value
+        for key, value in mapping.items()})
+
+
+class CachingDataManager(DataManagerInterface):
+    """
+    Read-through, write-invalidate cache around any data manager.
+
+    Reads are stored as immutable records and tuples in an LRU cache.
+    Each entry belongs to one or more scopes (the user list, one
+    user's collection, the popularity counters); a write invalidates
+    exactly the scopes it affects before returning. Streaming reads
+    are passed through uncached. Attributes not defined here, such as
+    'engine', are looked up on the wrapped data manager.
+    """
+
+    def __init__(self, data_manager, maxsize=1024):
+        """
+        Initialize the cache.
+
+        Args:
+            data_manager (DataManagerInterface): Wrapped data manager.
+            maxsize (int): Maximum number of cached reads. 0 disables
+                caching.
+        """
+        self.data_manager = data_manager
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._scopes = defaultdict(set)
+        self._generations = defaultdict(int)
+        self._hits = self._misses = self._evictions = 0
+
+    def __getattr__(self, name):
+        return getattr(self.data_manager, name)
+
+    def cache_info(self):
+        """
+        Report cache effectiveness.
+
+        Returns:
+            CacheInfo: Hits, misses, evictions, maxsize and currsize.
+        """
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions,
+                             self.maxsize, len(self._entries))
+
+    def clear_cache(self):
+        """
+        Drop every cached read, e.g. after writing to the database
+        without going through this data manager.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+            for scope in list(self._generations):
+                self._generations[scope] += 1
+
+    def _cached(self, key, scopes, load):
+        """
+        Return the cached value for key, loading it on a miss.
+
+        Args:
+            key (tuple): Cache key.
+            scopes (tuple): Scopes whose invalidation drops the entry.
+            load (callable): Produces the value from the data manager.
+        """
+        if not self.maxsize:
+            return load()
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key][0]
+            self._misses += 1
+            generations = [self._generations[scope] for scope in scopes]
+
+        value = load()
+
+        with self._lock:
+            # Skip storing if a write invalidated the scope meanwhile
+            if generations != [self._generations[s] for s in scopes]:
+                return value
+            self._entries[key] = (value, scopes)
+            for scope in scopes:
+                self._scopes[scope].add(key)
+            while len(self._entries) > self.maxsize:
+                evicted, (_, evicted_scopes) = self._entries.popitem(
+                    last=False)
+                for scope in evicted_scopes:
+                    self._scopes[scope].discard(evicted)
+                self._evictions += 1
+        return value
+
+    def _invalidate(self, *scopes):
+        """
+        Drop every entry belonging to the given scopes.
+        """
+        with self._lock:
+            for scope in scopes:
+                self._generations[scope] += 1
+                for key in self._scopes.pop(scope, ()):
+                    self._entries.pop(key, None)
+
+    def _invalidate_owner(self, user_id):
+        """
+        Invalidate the collection a changed movie belongs to.
+
+        Args:
+            user_id (int): Owner looked up before the write, or None
+                if the movie did not exist and nothing changed.
+        """
+        if user_id is not None:
+            self._invalidate(user_id, POPULAR)
+
+    def get_all_users(self):
+        """
+        Retrieve all users as UserRecord tuples.
+        """
+        return self._cached(
+            ("users",), (USERS,),
+            lambda: tuple(_user_record(user) for user in
+                          self.data_manager.get_all_users()))
+
+    def get_user(self, user_id):
+        """
+        Retrieve a single user as a UserRecord.
+        """
+        return self._cached(
+            ("user", user_id), (USERS, user_id),
+            lambda: _user_record(self.data_manager.get_user(user_id)))
+
+    def get_user_by_name(self, user_name):
+        """
+        Retrieve a user by name as a UserRecord.
+        """
+        return self._cached(
+            ("user_by_name", user_name.lower()), (USERS,),
+            lambda: _user_record(
+                self.data_manager.get_user_by_name(user_name)))
+
+    def add_user(self, user_name):
+        """
+        Add a user and invalidate the user list.
+        """
+        try:
+            return self.data_manager.add_user(user_name)
+        finally:
+            self._invalidate(USERS)
+
+    def delete_user(self, user_id):
+        """
+        Delete a user and invalidate their reads.
+        """
+        try:
+            return self.data_manager.delete_user(user_id)
+        finally:
+            self._invalidate(USERS, user_id, POPULAR)
+
+    def get_user_movies(self, user_id):
+        """
+        Retrieve a user's movies as MovieRecord tuples.
+        """
+        return self._cached(
+            ("movies", user_id), (user_id,),
+            lambda: tuple(_movie_record(movie) for movie in
+                          self.data_manager.get_user_movies(user_id)))
+
+    def find_user_movies(self, user_id, search='', sort='name_asc',
+                         offset=0, limit=None):
+        """
+        Search, sort and paginate a user's movies.
+        """
+        return self._cached(
+            ("find", user_id, search, sort, offset, limit), (user_id,),
+            lambda: tuple(_movie_record(movie) for movie in
+                          self.data_manager.find_user_movies(
+                              user_id, search, sort, offset, limit)))
+
+    def get_movie(self, user_id, movie_id):
+        """
+        Retrieve a movie as a MovieRecord.
+        """
+        return self._cached(
+            ("movie", user_id, movie_id), (user_id,),
+            lambda: _movie_record(
+                self.data_manager.get_movie(user_id, movie_id)))
+
+    def get_movie_owner(self, movie_id):
+        """
+        Find the owner of a movie, bypassing the cache.
+        """
+        return self.data_manager.get_movie_owner(movie_id)
+
+    def has_movie(self, user_id, imdb_id, title):
+        """
+        Check a user's movies using the cached keys.
+        """
+        imdb_ids, titles = self.get_movie_keys(user_id)
+        return imdb_id in imdb_ids or title.lower() in titles
+
+    def get_movie_keys(self, user_id):
+        """
+        Retrieve the identifying keys of a user's movies.
+        """
+        keys = self._cached(
+            ("keys", user_id), (user_id,),
+            lambda: tuple(frozenset(keys) for keys in
+                          self.data_manager.get_movie_keys(user_id)))
+        # Callers such as the importer extend the sets they receive
+        return set(keys[0]), set(keys[1])
+
+    def add_movie(self, user_id, title, director, year, rating,
+                  imdb_id):
+        """
+        Add a movie and invalidate the user's reads.
+        """
+        try:
+            return self.data_manager.add_movie(user_id, title, director,
+                                               year, rating, imdb_id)
+        finally:
+            self._invalidate(user_id, POPULAR)
+
+    def add_movies(self, user_id, movies):
+        """
+        Add movies and invalidate the user's reads.
+        """
+        try:
+            return self.data_manager.add_movies(user_id, movies)
+        finally:
+            self._invalidate(user_id, POPULAR)
+
+    def update_movie(self, movie_id, title=None, director=None,
+                     year=None, rating=None):
+        """
+        Update a movie and invalidate its owner's reads.
+        """
+        user_id = self.data_manager.get_movie_owner(movie_id)
+        try:
+            return self.data_manager.update_movie(movie_id, title,
+                                                  director, year, rating)
+        finally:
+            self._invalidate_owner(user_id)
+
+    def delete_movie(self, movie_id):
+        """
+        Delete a movie and invalidate its owner's reads.
+        """
+        user_id = self.data_manager.get_movie_owner(movie_id)
+        try:
+            return self.data_manager.delete_movie(movie_id)
+        finally:
+            self._invalidate_owner(user_id)
+
+    def iter_user_movies(self, user_id, batch_size=500):
+        """
+        Stream a user's movies, bypassing the cache.
+        """
+        return self.data_manager.iter_user_movies(user_id, batch_size)
+
+    def iter_ratings(self, batch_size=1000):
+        """
+        Stream all ratings, bypassing the cache.
+        """
+        return self.data_manager.iter_ratings(batch_size)
+
+    def get_user_stats(self, user_id, top_directors=5):
+        """
+        Retrieve a user's statistics as a read-only mapping.
+        """
+        return self._cached(
+            ("stats", user_id, top_directors), (user_id,),
+            lambda: _freeze(self.data_manager.get_user_stats(
+                user_id, top_directors)))
+
+    def get_popular_movies(self, order_by='owners', limit=25,
+                           min_ratings=1):
+        """
+        Retrieve the popular movies as read-only mappings.
+        """
+        return self._cached(
+            ("popular", order_by, limit, min_ratings), (POPULAR,),
+            lambda: tuple(_freeze(movie) for movie in
+                          self.data_manager.get_popular_movies(
+                              order_by, limit, min_ratings)))
+
+    def get_plots(self, imdb_ids):
+        """
+        Retrieve stored plots, bypassing the cache.
+        """
+        return self.data_manager.get_plots(imdb_ids)
+
+    def save_plots(self, plots):
+        """
+        Store plots; no cached read depends on them.
+        """
+        return self.data_manager.save_plots(plots)
+
+    def rebuild_stats(self):
+        """
+        Rebuild statistics and drop every cached read.
+        """
+        try:
+            return self.data_manager.rebuild_stats()
+        finally:
+            self.clear_cache()
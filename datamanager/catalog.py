@@ -0,0 +1,261 @@
+import csv
+import gzip
+import re
+from collections import namedtuple
+from itertools import islice
+from sqlalchemy import select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from datamanager.sqlite_data_manager import CatalogTitle
+
+IMDB_NULL = r"\N"
+DEFAULT_TITLE_TYPES = ("movie", "tvMovie", "video")
+FTS_TABLE = "catalog_titles_fts"
+
+CatalogImport = namedtuple("CatalogImport", ["imported", "skipped"])
+
+
+def open_dump(path):
+    """
+    Open an IMDb TSV dump as text, transparently handling gzip.
+
+    Args:
+        path (str): Path to a '.tsv' or '.tsv.gz' file.
+
+    Returns:
+        file: Text file object positioned at the header row.
+    """
+    with open(path, 'rb') as probe:
+        is_gzip = probe.read(2) == b'\x1f\x8b'
+    if is_gzip:
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def iter_title_basics(path, title_types=DEFAULT_TITLE_TYPES,
+                      on_malformed=None):
+    """
+    Stream rows from an IMDb 'title.basics' dump one at a time.
+
+    Args:
+        path (str): Path to the dump file.
+        title_types (tuple, optional): Title types to keep. None
+            keeps every row.
+        on_malformed (callable, optional): Called with every row that
+            is skipped because its columns do not match the header or
+            it has no IMDb ID.
+
+    Yields:
+        dict: Column values ready for insertion into catalog_titles.
+    """
+    csv.field_size_limit(1 << 20)
+    with open_dump(path) as dump:
+        reader = csv.reader(dump, delimiter='\t',
+                            quoting=csv.QUOTE_NONE)
+        header = next(reader, None)
+        if header is None:
+            return
+        index = {name: i for i, name in enumerate(header)}
+
+        def field(row, name):
+            value = row[index[name]] if name in index else IMDB_NULL
+            return None if value == IMDB_NULL else value
+
+        for row in reader:
+            if len(row) != len(header) or not row[index['tconst']]:
+                if on_malformed:
+                    on_malformed(row)
+                continue
+            title_type = field(row, 'titleType')
+            if title_types and title_type not in title_types:
+                continue
+            year = field(row, 'startYear')
+            yield {
+                'imdb_id': row[index['tconst']],
+                'title_type': title_type,
+                'primary_title': field(row, 'primaryTitle') or '',
+                'original_title': field(row, 'originalTitle'),
+                'start_year': int(year) if year and year.isdigit()
+                else None,
+                'genres': field(row, 'genres'),
+            }
+
+
+class Catalog:
+    """
+    Local, full-text searchable copy of an IMDb title dump.
+    """
+
+    def __init__(self, engine):
+        """
+        Initialize the catalog.
+
+        Args:
+            engine (Engine): SQLAlchemy engine holding the catalog.
+        """
+        self.engine = engine
+        CatalogTitle.__table__.create(engine, checkfirst=True)
+        # An empty index lets searches before the first import simply
+        # find nothing
+        with engine.begin() as conn:
+            self._create_search_index(conn)
+
+    def import_title_basics(self, path, chunk_size=5000,
+                            title_types=DEFAULT_TITLE_TYPES,
+                            progress=None):
+        """
+        Import a title dump in fixed-size chunks.
+
+        The search index is not maintained per insert; it is rebuilt
+        once after the last chunk, in a single transaction, so
+        searches keep using the previous index during the import and
+        memory use stays bounded by chunk_size. Existing titles are
+        updated in place, keeping the rowids the index points to.
+
+        Args:
+            path (str): Path to a '.tsv' or '.tsv.gz' dump.
+            chunk_size (int): Number of rows per insert batch.
+            title_types (tuple, optional): Title types to keep.
+            progress (callable, optional): Called with the running
+                total after every chunk.
+
+        Returns:
+            CatalogImport: Number of rows imported, and number of rows
+            skipped because they were malformed or failed to insert.
+        """
+        malformed = 0
+
+        def count_malformed(row):
+            nonlocal malformed
+            malformed += 1
+
+        rows = iter_title_basics(path, title_types,
+                                 on_malformed=count_malformed)
+        table = CatalogTitle.__table__
+        statement = sqlite_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.imdb_id],
+            set_={column.name: statement.excluded[column.name]
+                  for column in table.c if not column.primary_key})
+        imported = failed = 0
+
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(statement, chunk)
+                imported += len(chunk)
+            except SQLAlchemyError as e:
+                print(f"Error importing catalog chunk: {e}")
+                failed += len(chunk)
+            if progress:
+                progress(imported)
+
+        self.build_search_index()
+        return CatalogImport(imported, failed + malformed)
+
+    def build_search_index(self):
+        """
+        (Re)build the FTS5 index over the catalog titles.
+
+        Runs in one transaction, so readers see either the old index
+        or the complete new one.
+        """
+        with self.engine.begin() as conn:
+            self._create_search_index(conn)
+            conn.execute(text(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) "
+                f"VALUES('rebuild')"))
+
+    def lookup(self, imdb_ids):
+        """
+        Retrieve catalog titles by IMDb ID.
+
+        Args:
+            imdb_ids (iterable): IMDb IDs to look up.
+
+        Returns:
+            dict: Details shaped like OMDb answers, keyed by IMDb ID,
+            for the IDs in the catalog. The catalog has no director,
+            rating or plot.
+        """
+        imdb_ids = list(imdb_ids)
+        if not imdb_ids:
+            return {}
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.execute(
+                    select(CatalogTitle.imdb_id, CatalogTitle.primary_title,
+                           CatalogTitle.start_year)
+                    .where(CatalogTitle.imdb_id.in_(imdb_ids))).all()
+        except SQLAlchemyError as e:
+            print(f"Error looking up catalog titles: {e}")
+            return {}
+
+        return {
+            imdb_id: {
+                "Response": "True",
+                "Title": title,
+                "Year": str(year) if year else "N/A",
+                "imdbID": imdb_id,
+            }
+            for imdb_id, title, year in rows
+        }
+
+    @staticmethod
+    def _create_search_index(conn):
+        """
+        Create the FTS5 table over the catalog titles if it is missing.
+
+        Args:
+            conn (Connection): Connection inside a transaction.
+        """
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(primary_title, original_title, "
+            f"content='catalog_titles', content_rowid='rowid', "
+            f"tokenize='unicode61 remove_diacritics 2')"))
+
+    def search(self, query, limit=10):
+        """
+        Search the catalog by title.
+
+        Args:
+            query (str): Title keywords; the last word may be partial.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list: Results shaped like OMDb 'Search' entries, empty if
+            nothing matches or the catalog has not been imported.
+        """
+        words = re.findall(r"\w+", (query or "").lower())
+        if not words:
+            return []
+        match = " ".join(f'"{word}"' for word in words) + "*"
+
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.execute(text(
+                    f"SELECT c.imdb_id, c.primary_title, c.start_year, "
+                    f"c.title_type FROM {FTS_TABLE} "
+                    f"JOIN catalog_titles c "
+                    f"ON c.rowid = {FTS_TABLE}.rowid "
+                    f"WHERE {FTS_TABLE} MATCH :match "
+                    f"ORDER BY rank LIMIT :limit"),
+                    {"match": match, "limit": limit}).all()
+        except SQLAlchemyError as e:
+            print(f"Error searching catalog: {e}")
+            return []
+
+        return [
+            {
+                "Title": title,
+                "Year": str(year) if year else "N/A",
+                "imdbID": imdb_id,
+                "Type": title_type,
+                "Poster": "N/A",
+            }
+            for imdb_id, title, year, title_type in rows
+        ]
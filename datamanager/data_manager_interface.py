@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
 
+SORT_OPTIONS = ('name_asc', 'name_desc', 'year_asc', 'year_desc',
+                'rating_asc', 'rating_desc')
+
 
 class DataManagerInterface(ABC):
     """
@@ -16,6 +19,58 @@ class DataManagerInterface(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_user(self, user_id):
+        """
+        Retrieve a single user.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            object: The user, or None if it does not exist.
+        """
+        pass
+
+    @abstractmethod
+    def get_user_by_name(self, user_name):
+        """
+        Retrieve a user by name, ignoring case.
+
+        Args:
+            user_name (str): Name of the user.
+
+        Returns:
+            object: The user, or None if it does not exist.
+        """
+        pass
+
+    @abstractmethod
+    def add_user(self, user_name):
+        """
+        Add a new user.
+
+        Args:
+            user_name (str): Name of the user.
+
+        Returns:
+            None
+        """
+        pass
+
+    @abstractmethod
+    def delete_user(self, user_id):
+        """
+        Delete a user and everything derived from their collection.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            bool: True if the user was deleted.
+        """
+        pass
+
     @abstractmethod
     def get_user_movies(self, user_id):
         """
@@ -30,7 +85,83 @@ class DataManagerInterface(ABC):
         pass
 
     @abstractmethod
-    def add_movie(self, user_id, title, director, year, rating):
+    def find_user_movies(self, user_id, search='', sort='name_asc',
+                         offset=0, limit=None):
+        """
+        Search, sort and paginate a user's movies.
+
+        Args:
+            user_id (int): ID of the user.
+            search (str): Case-insensitive text matched against the
+                title and the director. Empty matches everything.
+            sort (str): One of SORT_OPTIONS. Ties keep insertion
+                order; unrated movies sort as rating 0.
+            offset (int): Number of matching movies to skip.
+            limit (int, optional): Maximum number of movies.
+
+        Returns:
+            list: A list of movie objects.
+        """
+        pass
+
+    @abstractmethod
+    def get_movie(self, user_id, movie_id):
+        """
+        Retrieve a movie from a user's collection.
+
+        Args:
+            user_id (int): ID of the user.
+            movie_id (int): ID of the movie.
+
+        Returns:
+            object: The movie, or None if the user does not own it.
+        """
+        pass
+
+    @abstractmethod
+    def get_movie_owner(self, movie_id):
+        """
+        Find the user whose collection holds a movie.
+
+        Args:
+            movie_id (int): ID of the movie.
+
+        Returns:
+            int: ID of the owner, or None if the movie does not exist.
+        """
+        pass
+
+    @abstractmethod
+    def has_movie(self, user_id, imdb_id, title):
+        """
+        Check whether a user already has a movie.
+
+        Args:
+            user_id (int): ID of the user.
+            imdb_id (str): IMDb ID of the movie.
+            title (str): Title of the movie, compared ignoring case.
+
+        Returns:
+            bool: True if either the IMDb ID or the title matches.
+        """
+        pass
+
+    @abstractmethod
+    def get_movie_keys(self, user_id):
+        """
+        Retrieve the identifying keys of a user's movies.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            tuple: Set of IMDb IDs and set of lower-cased titles.
+        """
+        pass
+
+    @abstractmethod
+    def add_movie(self, user_id, title, director, year, rating,
+                  imdb_id):
         """
         Add a new movie for a specific user.
 
@@ -40,12 +171,28 @@ class DataManagerInterface(ABC):
             director (str): Movie director.
             year (int): Year of the movie.
             rating (float): Rating of the movie.
+            imdb_id (str): IMDb ID of the movie.
 
         Returns:
             None
         """
         pass
 
+    @abstractmethod
+    def add_movies(self, user_id, movies):
+        """
+        Add many movies for a user at once.
+
+        Args:
+            user_id (int): ID of the user.
+            movies (list): Dicts with 'title', 'director', 'year',
+                           'rating' and 'imdb_id' keys.
+
+        Returns:
+            int: Number of movies added.
+        """
+        pass
+
     @abstractmethod
     def update_movie(self, movie_id, title=None, director=None,
                      year=None, rating=None):
@@ -76,3 +223,98 @@ class DataManagerInterface(ABC):
             None
         """
         pass
+
+    @abstractmethod
+    def iter_user_movies(self, user_id, batch_size=500):
+        """
+        Stream a user's movies in insertion order.
+
+        Args:
+            user_id (int): ID of the user.
+            batch_size (int): Number of rows fetched at a time.
+
+        Yields:
+            tuple: (name, director, year, rating, imdb_id) rows.
+        """
+        pass
+
+    @abstractmethod
+    def iter_ratings(self, batch_size=1000):
+        """
+        Stream every user's movies for cross-user analysis.
+
+        Args:
+            batch_size (int): Number of rows fetched at a time.
+
+        Yields:
+            tuple: (user_id, imdb_id, name, rating) rows.
+        """
+        pass
+
+    @abstractmethod
+    def get_user_stats(self, user_id, top_directors=5):
+        """
+        Retrieve the statistics of a user's collection.
+
+        Args:
+            user_id (int): ID of the user.
+            top_directors (int): Number of directors to include.
+
+        Returns:
+            dict: 'movie_count', 'average_rating', 'decades' and
+            'top_directors'.
+        """
+        pass
+
+    @abstractmethod
+    def get_popular_movies(self, order_by='owners', limit=25,
+                           min_ratings=1):
+        """
+        Retrieve the site-wide most collected or highest rated movies.
+
+        Args:
+            order_by (str): 'owners' or 'rating'.
+            limit (int): Maximum number of movies.
+            min_ratings (int): Ratings needed to rank by rating.
+
+        Returns:
+            list: Dicts with 'imdb_id', 'name', 'owner_count' and
+            'average_rating' keys.
+        """
+        pass
+
+    @abstractmethod
+    def get_plots(self, imdb_ids):
+        """
+        Retrieve stored plots.
+
+        Args:
+            imdb_ids (iterable): IMDb IDs to look up.
+
+        Returns:
+            dict: Plot keyed by IMDb ID, for the IDs that are stored.
+        """
+        pass
+
+    @abstractmethod
+    def save_plots(self, plots):
+        """
+        Store plots, replacing any stored before.
+
+        Args:
+            plots (dict): Plot keyed by IMDb ID.
+
+        Returns:
+            None
+        """
+        pass
+
+    @abstractmethod
+    def rebuild_stats(self):
+        """
+        Recompute all derived statistics from the movies.
+
+        Returns:
+            int: Number of users with statistics.
+        """
+        pass
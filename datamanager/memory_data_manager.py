@@ -0,0 +1,512 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import count, islice
+from datamanager.data_manager_interface import DataManagerInterface
+from datamanager.records import UserRecord, MovieRecord
+from datamanager.sqlite_data_manager import split_directors
+
+# Sorted per-user indexes: name -> sort key of a movie
+INDEX_KEYS = {
+    'name': lambda movie: movie.name.lower(),
+    'year': lambda movie: movie.year,
+    'rating': lambda movie: movie.rating or 0,
+}
+
+
+def _descending(entries):
+    """
+    Walk a sorted (key, id) list from the largest key down, keeping
+    ascending id order among equal keys.
+    """
+    end = len(entries)
+    while end > 0:
+        start = bisect_left(entries, (entries[end - 1][0],), 0, end)
+        yield from entries[start:end]
+        end = start
+
+
+class _UserCollection:
+    """
+    A user's movies with sorted indexes and running statistics.
+    """
+
+    def __init__(self):
+        self.movies = {}
+        self.indexes = {name: [] for name in INDEX_KEYS}
+        self.movie_count = 0
+        self.rating_sum = 0.0
+        self.rated_count = 0
+        self.decades = Counter()
+        self.directors = Counter()
+
+    def add(self, movie):
+        self.movies[movie.id] = movie
+        for name, key in INDEX_KEYS.items():
+            insort(self.indexes[name], (key(movie), movie.id))
+        self._count(movie, 1)
+
+    def remove(self, movie):
+        del self.movies[movie.id]
+        for name, key in INDEX_KEYS.items():
+            entries = self.indexes[name]
+            del entries[bisect_left(entries, (key(movie), movie.id))]
+        self._count(movie, -1)
+
+    def _count(self, movie, sign):
+        self.movie_count += sign
+        if movie.rating is not None:
+            self.rating_sum += sign * movie.rating
+            self.rated_count += sign
+        keys = [(self.decades, movie.year // 10 * 10)] \
+            if movie.year is not None else []
+        keys += [(self.directors, director)
+                 for director in split_directors(movie.director)]
+        for counter, key in keys:
+            counter[key] += sign
+            if counter[key] <= 0:
+                del counter[key]
+
+
+class InMemoryDataManager(DataManagerInterface):
+    """
+    DataManagerInterface implementation backed by dictionaries.
+
+    Every user keeps sorted (key, movie_id) indexes by name, year and
+    rating, so sorted and paginated reads walk an index instead of
+    sorting. Statistics and popularity counters are updated on every
+    write. Returned users and movies are immutable records.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty InMemoryDataManager.
+        """
+        self._lock = threading.RLock()
+        self._user_ids = count(1)
+        self._movie_ids = count(1)
+        self._users = {}
+        self._users_by_name = {}
+        self._collections = {}
+        self._movie_owner = {}
+        self._popularity = {}
+        self._plots = {}
+
+    def get_all_users(self):
+        """
+        Retrieve all users.
+
+        Returns:
+            list: List of UserRecord objects.
+        """
+        return list(self._users.values())
+
+    def get_user(self, user_id):
+        """
+        Retrieve a single user.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            UserRecord: The user, or None if it does not exist.
+        """
+        return self._users.get(user_id)
+
+    def get_user_by_name(self, user_name):
+        """
+        Retrieve a user by name, ignoring case.
+
+        Args:
+            user_name (str): Name of the user.
+
+        Returns:
+            UserRecord: The user, or None if it does not exist.
+        """
+        return self._users_by_name.get(user_name.lower())
+
+    def add_user(self, user_name):
+        """
+        Add a new user.
+
+        Args:
+            user_name (str): Name of the user.
+        """
+        with self._lock:
+            if user_name.lower() in self._users_by_name:
+                print(f"Error adding user: '{user_name}' already exists")
+                return
+            user = UserRecord(next(self._user_ids), user_name)
+            self._users[user.id] = user
+            self._users_by_name[user_name.lower()] = user
+            self._collections[user.id] = _UserCollection()
+
+    def delete_user(self, user_id):
+        """
+        Delete a user, their movies and their statistics.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            bool: True if the user was deleted.
+        """
+        with self._lock:
+            user = self._users.pop(user_id, None)
+            if not user:
+                return False
+            del self._users_by_name[user.name.lower()]
+            collection = self._collections.pop(user_id)
+            for movie in collection.movies.values():
+                del self._movie_owner[movie.id]
+                self._count_popularity(movie, -1)
+            return True
+
+    def get_user_movies(self, user_id):
+        """
+        Retrieve movies for a specific user.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            list: List of MovieRecord objects.
+        """
+        collection = self._collections.get(user_id)
+        return list(collection.movies.values()) if collection else []
+
+    def find_user_movies(self, user_id, search='', sort='name_asc',
+                         offset=0, limit=None):
+        """
+        Search, sort and paginate a user's movies using its indexes.
+
+        Args:
+            user_id (int): ID of the user.
+            search (str): Text matched against title and director.
+            sort (str): One of SORT_OPTIONS.
+            offset (int): Number of matching movies to skip.
+            limit (int, optional): Maximum number of movies.
+
+        Returns:
+            list: List of MovieRecord objects.
+        """
+        collection = self._collections.get(user_id)
+        if not collection:
+            return []
+
+        with self._lock:
+            field, _, direction = sort.partition('_')
+            if field not in INDEX_KEYS:
+                field, direction = 'name', 'asc'
+            entries = collection.indexes[field]
+            ordered = _descending(entries) if direction == 'desc' \
+                else iter(entries)
+            movies = (collection.movies[movie_id]
+                      for _, movie_id in ordered)
+            if search:
+                search = search.lower()
+                movies = (movie for movie in movies
+                          if search in movie.name.lower() or
+                          search in movie.director.lower())
+            stop = offset + limit if limit is not None else None
+            return list(islice(movies, offset, stop))
+
+    def get_movie(self, user_id, movie_id):
+        """
+        Retrieve a movie from a user's collection.
+
+        Args:
+            user_id (int): ID of the user.
+            movie_id (int): ID of the movie.
+
+        Returns:
+            MovieRecord: The movie, or None if the user does not own it.
+        """
+        collection = self._collections.get(user_id)
+        return collection.movies.get(movie_id) if collection else None
+
+    def get_movie_owner(self, movie_id):
+        """
+        Find the user whose collection holds a movie.
+
+        Args:
+            movie_id (int): ID of the movie.
+
+        Returns:
+            int: ID of the owner, or None if the movie does not exist.
+        """
+        return self._movie_owner.get(movie_id)
+
+    def has_movie(self, user_id, imdb_id, title):
+        """
+        Check whether a user already has a movie.
+
+        Args:
+            user_id (int): ID of the user.
+            imdb_id (str): IMDb ID of the movie.
+            title (str): Title of the movie, compared ignoring case.
+
+        Returns:
+            bool: True if either the IMDb ID or the title matches.
+        """
+        imdb_ids, titles = self.get_movie_keys(user_id)
+        return imdb_id in imdb_ids or title.lower() in titles
+
+    def get_movie_keys(self, user_id):
+        """
+        Retrieve the identifying keys of a user's movies.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            tuple: Set of IMDb IDs and set of lower-cased titles.
+        """
+        movies = self.get_user_movies(user_id)
+        return ({movie.imdb_id for movie in movies},
+                {movie.name.lower() for movie in movies})
+
+    def add_movie(self, user_id, title, director, year, rating,
+                  imdb_id):
+        """
+        Add a movie for a user.
+
+        Args:
+            user_id (int): ID of the user.
+            title (str): Movie title.
+            director (str): Director of the movie.
+            year (int): Year of release.
+            rating (float): Rating of the movie.
+            imdb_id (str): IMDb ID for the movie.
+        """
+        self.add_movies(user_id, [{
+            'title': title, 'director': director, 'year': year,
+            'rating': rating, 'imdb_id': imdb_id}])
+
+    def add_movies(self, user_id, movies):
+        """
+        Add many movies for a user at once.
+
+        Args:
+            user_id (int): ID of the user.
+            movies (list): Dicts with 'title', 'director', 'year',
+                           'rating' and 'imdb_id' keys.
+
+        Returns:
+            int: Number of movies added.
+        """
+        with self._lock:
+            collection = self._collections.get(user_id)
+            if collection is None:
+                print(f"Error adding movies: user {user_id} not found")
+                return 0
+            for movie in movies:
+                if movie['year'] is None or not movie['director']:
+                    print("Error adding movie: year and director are "
+                          "required")
+                    return 0
+            for movie in movies:
+                record = MovieRecord(
+                    next(self._movie_ids), movie['title'].title(),
+                    movie['director'], movie['year'], movie['rating'],
+                    user_id, movie['imdb_id'])
+                collection.add(record)
+                self._movie_owner[record.id] = user_id
+                self._count_popularity(record, 1)
+            return len(movies)
+
+    def update_movie(self, movie_id, title=None, director=None,
+                     year=None, rating=None):
+        """
+        Update movie details.
+
+        Args:
+            movie_id (int): Movie's ID.
+            title (str, optional): Updated title.
+            director (str, optional): Updated director.
+            year (int, optional): Updated year of release.
+            rating (float, optional): Updated rating.
+        """
+        with self._lock:
+            user_id = self._movie_owner.get(movie_id)
+            if user_id is None:
+                return
+            collection = self._collections[user_id]
+            old = collection.movies[movie_id]
+            new = old._replace(name=title or old.name,
+                               director=director or old.director,
+                               year=year or old.year,
+                               rating=rating or old.rating)
+            if new != old:
+                collection.remove(old)
+                self._count_popularity(old, -1)
+                collection.add(new)
+                self._count_popularity(new, 1)
+
+    def delete_movie(self, movie_id):
+        """
+        Delete a movie.
+
+        Args:
+            movie_id (int): ID of the movie to delete.
+        """
+        with self._lock:
+            user_id = self._movie_owner.pop(movie_id, None)
+            if user_id is None:
+                return
+            collection = self._collections[user_id]
+            movie = collection.movies[movie_id]
+            collection.remove(movie)
+            self._count_popularity(movie, -1)
+
+    def iter_user_movies(self, user_id, batch_size=500):
+        """
+        Stream a user's movies in insertion order.
+
+        Args:
+            user_id (int): ID of the user.
+            batch_size (int): Unused; kept for interface parity.
+
+        Yields:
+            tuple: (name, director, year, rating, imdb_id) rows.
+        """
+        for movie in sorted(self.get_user_movies(user_id),
+                            key=lambda m: m.id):
+            yield (movie.name, movie.director, movie.year, movie.rating,
+                   movie.imdb_id)
+
+    def iter_ratings(self, batch_size=1000):
+        """
+        Stream every user's movies for cross-user analysis.
+
+        Args:
+            batch_size (int): Unused; kept for interface parity.
+
+        Yields:
+            tuple: (user_id, imdb_id, name, rating) rows.
+        """
+        for collection in list(self._collections.values()):
+            for movie in list(collection.movies.values()):
+                yield movie.user_id, movie.imdb_id, movie.name, \
+                    movie.rating
+
+    def get_user_stats(self, user_id, top_directors=5):
+        """
+        Retrieve the running statistics of a user's collection.
+
+        Args:
+            user_id (int): ID of the user.
+            top_directors (int): Number of directors to include.
+
+        Returns:
+            dict: 'movie_count', 'average_rating', 'decades' and
+            'top_directors'.
+        """
+        collection = self._collections.get(user_id) or _UserCollection()
+        return {
+            'movie_count': collection.movie_count,
+            'average_rating':
+                collection.rating_sum / collection.rated_count
+                if collection.rated_count else None,
+            'decades': sorted(collection.decades.items()),
+            'top_directors': heapq.nsmallest(
+                top_directors, collection.directors.items(),
+                key=lambda item: (-item[1], item[0])),
+        }
+
+    def get_popular_movies(self, order_by='owners', limit=25,
+                           min_ratings=1):
+        """
+        Retrieve the site-wide most collected or highest rated movies.
+
+        Args:
+            order_by (str): 'owners' or 'rating'.
+            limit (int): Maximum number of movies.
+            min_ratings (int): Ratings needed to rank by rating.
+
+        Returns:
+            list: Dicts with 'imdb_id', 'name', 'owner_count' and
+            'average_rating' keys.
+        """
+        movies = [
+            {
+                'imdb_id': imdb_id,
+                'name': entry['name'],
+                'owner_count': entry['owner_count'],
+                'average_rating':
+                    entry['rating_sum'] / entry['rating_count']
+                    if entry['rating_count'] else None,
+                'rating_count': entry['rating_count'],
+            }
+            for imdb_id, entry in list(self._popularity.items())
+        ]
+        if order_by == 'rating':
+            movies = [m for m in movies
+                      if m['rating_count'] >= min_ratings]
+            key = (lambda m: (-m['average_rating'], -m['owner_count'],
+                              m['imdb_id']))
+        else:
+            key = (lambda m: (-m['owner_count'],
+                              -(m['average_rating'] or 0),
+                              m['imdb_id']))
+        top = heapq.nsmallest(limit, movies, key=key)
+        for movie in top:
+            del movie['rating_count']
+        return top
+
+    def get_plots(self, imdb_ids):
+        """
+        Retrieve stored plots.
+
+        Args:
+            imdb_ids (iterable): IMDb IDs to look up.
+
+        Returns:
+            dict: Plot keyed by IMDb ID, for the IDs that are stored.
+        """
+        return {imdb_id: self._plots[imdb_id] for imdb_id in imdb_ids
+                if imdb_id in self._plots}
+
+    def save_plots(self, plots):
+        """
+        Store plots, replacing any stored before.
+
+        Args:
+            plots (dict): Plot keyed by IMDb ID.
+        """
+        with self._lock:
+            self._plots.update(plots)
+
+    def rebuild_stats(self):
+        """
+        Recompute statistics and popularity from the stored movies.
+
+        Returns:
+            int: Number of users with movies.
+        """
+        with self._lock:
+            self._popularity = {}
+            users = 0
+            for user_id, old in self._collections.items():
+                collection = _UserCollection()
+                for movie in old.movies.values():
+                    collection.add(movie)
+                    self._count_popularity(movie, 1)
+                self._collections[user_id] = collection
+                users += 1 if collection.movies else 0
+            return users
+
+    def _count_popularity(self, movie, sign):
+        """
+        Add (or with sign=-1, remove) a movie to the popularity counters.
+        """
+        entry = self._popularity.setdefault(movie.imdb_id, {
+            'name': movie.name, 'owner_count': 0, 'rating_sum': 0.0,
+            'rating_count': 0})
+        entry['owner_count'] += sign
+        if movie.rating is not None:
+            entry['rating_sum'] += sign * movie.rating
+            entry['rating_count'] += sign
+        if entry['owner_count'] <= 0:
+            del self._popularity[movie.imdb_id]
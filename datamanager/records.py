@@ -0,0 +1,9 @@
+from collections import namedtuple
+
+# Read-only rows returned by the data managers. Namedtuples carry no
+# per-instance __dict__ and no session state, so they are cheap to
+# build for large listings and safe to share between requests.
+UserRecord = namedtuple("UserRecord", ["id", "name"])
+MovieRecord = namedtuple(
+    "MovieRecord",
+    ["id", "name", "director", "year", "rating", "user_id", "imdb_id"])
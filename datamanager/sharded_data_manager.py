@@ -0,0 +1,454 @@
+import heapq
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, groupby
+from operator import itemgetter
+from datamanager.data_manager_interface import DataManagerInterface
+from datamanager.sqlite_data_manager import SQLiteDataManager, User, \
+    Movie, UserStats, UserDecadeCount, UserDirectorCount, \
+    MoviePopularity, MoviePlot
+
+# The directory also holds the catalog, which Catalog creates itself
+DIRECTORY_TABLES = [User.__table__, MoviePlot.__table__]
+SHARD_TABLES = [model.__table__ for model in (
+    User, Movie, UserStats, UserDecadeCount, UserDirectorCount,
+    MoviePopularity)]
+
+
+def shard_paths(db_file_name, shard_count):
+    """
+    Derive shard file names from the directory database file name.
+
+    Args:
+        db_file_name (str): e.g. 'moviweb.db'.
+        shard_count (int): Number of shards.
+
+    Returns:
+        list: e.g. ['moviweb.shard0.db', 'moviweb.shard1.db'].
+    """
+    root, ext = os.path.splitext(str(db_file_name))
+    return [f"{root}.shard{index}{ext}" for index in range(shard_count)]
+
+
+class ShardedDataManager(DataManagerInterface):
+    """
+    DataManagerInterface implementation spread over several SQLite files.
+
+    A directory database holds the users, the catalog and the plots.
+    Each user's movies, statistics and popularity counters live in one
+    of N shard databases, so writes to different shards take different
+    SQLite write locks and run in parallel. Users are mirrored into
+    their shard to satisfy its foreign keys. Site-wide reads fan out to
+    every shard and merge the results.
+
+    Movie IDs are global: a movie stored with local ID n in shard s
+    has ID n * N + s, so the shard can be found from the ID alone.
+    """
+
+    def __init__(self, db_file_name, shard_count=4):
+        """
+        Initialize ShardedDataManager.
+
+        Args:
+            db_file_name (str): Directory database file name; shard
+                files are created next to it.
+            shard_count (int): Number of shards. Changing it later
+                requires moving the existing collections.
+        """
+        self.directory = SQLiteDataManager(db_file_name,
+                                           tables=DIRECTORY_TABLES)
+        self.shards = [SQLiteDataManager(path, tables=SHARD_TABLES)
+                       for path in shard_paths(db_file_name, shard_count)]
+
+    @property
+    def engine(self):
+        """
+        Engine: The directory database, which also holds the catalog.
+        """
+        return self.directory.engine
+
+    def shard_index(self, user_id):
+        """
+        Find the shard holding a user's collection.
+
+        User IDs are assigned sequentially, so taking them modulo the
+        shard count spreads users evenly.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            int: Index into self.shards.
+        """
+        return user_id % len(self.shards)
+
+    def _shard(self, user_id):
+        return self.shards[self.shard_index(user_id)]
+
+    def _global_movie(self, shard_index, movie):
+        """
+        Replace a shard-local movie ID with its global ID.
+        """
+        if movie is None:
+            return None
+        return movie._replace(id=movie.id * len(self.shards) + shard_index)
+
+    def _locate_movie(self, movie_id):
+        """
+        Split a global movie ID.
+
+        Returns:
+            tuple: (shard, local movie ID).
+        """
+        return (self.shards[movie_id % len(self.shards)],
+                movie_id // len(self.shards))
+
+    def _fan_out(self, call):
+        """
+        Run a call on every shard in parallel.
+
+        Args:
+            call (callable): Receives a shard, returns its result.
+
+        Returns:
+            list: Results in shard order.
+        """
+        with ThreadPoolExecutor(max_workers=len(self.shards)) as pool:
+            return list(pool.map(call, self.shards))
+
+    def get_all_users(self):
+        """
+        Retrieve all users from the directory.
+
+        Returns:
+            list: List of UserRecord objects.
+        """
+        return self.directory.get_all_users()
+
+    def get_user(self, user_id):
+        """
+        Retrieve a single user from the directory.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            UserRecord: The user, or None if it does not exist.
+        """
+        return self.directory.get_user(user_id)
+
+    def get_user_by_name(self, user_name):
+        """
+        Retrieve a user by name, ignoring case.
+
+        Args:
+            user_name (str): Name of the user.
+
+        Returns:
+            UserRecord: The user, or None if it does not exist.
+        """
+        return self.directory.get_user_by_name(user_name)
+
+    def add_user(self, user_name):
+        """
+        Add a user to the directory and mirror it into its shard.
+
+        Args:
+            user_name (str): Name of the user.
+        """
+        self.directory.add_user(user_name)
+        user = self.directory.get_user_by_name(user_name)
+        if user is None:
+            return
+        shard = self._shard(user.id)
+        shard.add_user(user.name, user_id=user.id)
+        if shard.get_user(user.id) is None:
+            # Keep the directory and the shards consistent
+            self.directory.delete_user(user.id)
+
+    def delete_user(self, user_id):
+        """
+        Delete a user's collection from its shard, then the user.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            bool: True if the user was deleted.
+        """
+        shard = self._shard(user_id)
+        if shard.get_user(user_id) is not None and \
+                not shard.delete_user(user_id):
+            return False
+        return self.directory.delete_user(user_id)
+
+    def get_user_movies(self, user_id):
+        """
+        Retrieve a user's movies from their shard.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            list: List of MovieRecord objects.
+        """
+        index = self.shard_index(user_id)
+        return [self._global_movie(index, movie) for movie in
+                self.shards[index].get_user_movies(user_id)]
+
+    def find_user_movies(self, user_id, search='', sort='name_asc',
+                         offset=0, limit=None):
+        """
+        Search, sort and paginate a user's movies in their shard.
+
+        Args:
+            user_id (int): ID of the user.
+            search (str): Text matched against title and director.
+            sort (str): One of SORT_OPTIONS.
+            offset (int): Number of matching movies to skip.
+            limit (int, optional): Maximum number of movies.
+
+        Returns:
+            list: List of MovieRecord objects.
+        """
+        index = self.shard_index(user_id)
+        return [self._global_movie(index, movie) for movie in
+                self.shards[index].find_user_movies(
+                    user_id, search, sort, offset, limit)]
+
+    def get_movie(self, user_id, movie_id):
+        """
+        Retrieve a movie from a user's collection.
+
+        Args:
+            user_id (int): ID of the user.
+            movie_id (int): Global ID of the movie.
+
+        Returns:
+            MovieRecord: The movie, or None if the user does not own it.
+        """
+        index = self.shard_index(user_id)
+        if movie_id % len(self.shards) != index:
+            return None
+        return self._global_movie(index, self.shards[index].get_movie(
+            user_id, movie_id // len(self.shards)))
+
+    def get_movie_owner(self, movie_id):
+        """
+        Find the owner of a movie in the shard its ID points to.
+
+        Args:
+            movie_id (int): Global ID of the movie.
+
+        Returns:
+            int: ID of the owner, or None if the movie does not exist.
+        """
+        shard, local_id = self._locate_movie(movie_id)
+        return shard.get_movie_owner(local_id)
+
+    def has_movie(self, user_id, imdb_id, title):
+        """
+        Check whether a user already has a movie.
+
+        Args:
+            user_id (int): ID of the user.
+            imdb_id (str): IMDb ID of the movie.
+            title (str): Title of the movie, compared ignoring case.
+
+        Returns:
+            bool: True if either the IMDb ID or the title matches.
+        """
+        return self._shard(user_id).has_movie(user_id, imdb_id, title)
+
+    def get_movie_keys(self, user_id):
+        """
+        Retrieve the identifying keys of a user's movies.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            tuple: Set of IMDb IDs and set of lower-cased titles.
+        """
+        return self._shard(user_id).get_movie_keys(user_id)
+
+    def add_movie(self, user_id, title, director, year, rating,
+                  imdb_id):
+        """
+        Add a movie to the user's shard.
+
+        Args:
+            user_id (int): ID of the user.
+            title (str): Movie title.
+            director (str): Director of the movie.
+            year (int): Year of the movie.
+            rating (float): Rating of the movie.
+            imdb_id (str): IMDb ID of the movie.
+        """
+        return self._shard(user_id).add_movie(user_id, title, director,
+                                              year, rating, imdb_id)
+
+    def add_movies(self, user_id, movies):
+        """
+        Add many movies to the user's shard in one transaction.
+
+        Args:
+            user_id (int): ID of the user.
+            movies (list): Dicts with 'title', 'director', 'year',
+                           'rating' and 'imdb_id' keys.
+
+        Returns:
+            int: Number of movies added.
+        """
+        return self._shard(user_id).add_movies(user_id, movies)
+
+    def update_movie(self, movie_id, title=None, director=None,
+                     year=None, rating=None):
+        """
+        Update a movie in the shard its ID points to.
+
+        Args:
+            movie_id (int): Global ID of the movie.
+            title (str, optional): Updated title.
+            director (str, optional): Updated director.
+            year (int, optional): Updated year.
+            rating (float, optional): Updated rating.
+        """
+        shard, local_id = self._locate_movie(movie_id)
+        return shard.update_movie(local_id, title, director, year, rating)
+
+    def delete_movie(self, movie_id):
+        """
+        Delete a movie from the shard its ID points to.
+
+        Args:
+            movie_id (int): Global ID of the movie.
+        """
+        shard, local_id = self._locate_movie(movie_id)
+        return shard.delete_movie(local_id)
+
+    def iter_user_movies(self, user_id, batch_size=500):
+        """
+        Stream a user's movies from their shard.
+
+        Args:
+            user_id (int): ID of the user.
+            batch_size (int): Number of rows fetched per round-trip.
+
+        Yields:
+            Row: (name, director, year, rating, imdb_id) rows.
+        """
+        return self._shard(user_id).iter_user_movies(user_id, batch_size)
+
+    def iter_ratings(self, batch_size=1000):
+        """
+        Stream every user's movies, one shard after another.
+
+        Args:
+            batch_size (int): Number of rows fetched per round-trip.
+
+        Yields:
+            Row: (user_id, imdb_id, name, rating) rows.
+        """
+        return chain.from_iterable(
+            shard.iter_ratings(batch_size) for shard in self.shards)
+
+    def get_user_stats(self, user_id, top_directors=5):
+        """
+        Retrieve the statistics of a user's collection from their shard.
+
+        Args:
+            user_id (int): ID of the user.
+            top_directors (int): Number of directors to include.
+
+        Returns:
+            dict: 'movie_count', 'average_rating', 'decades' and
+            'top_directors'.
+        """
+        return self._shard(user_id).get_user_stats(user_id, top_directors)
+
+    def get_popular_movies(self, order_by='owners', limit=25,
+                           min_ratings=1):
+        """
+        Merge every shard's popularity counters and rank the movies.
+
+        A movie collected in several shards has partial counters in
+        each. The shards stream their counters in IMDb ID order, so
+        the partials of a movie arrive together and are summed as the
+        streams are merged; only the best 'limit' movies are kept in
+        memory. This reads every counter row; the leaderboard calls it
+        periodically, not per request.
+
+        Args:
+            order_by (str): 'owners' or 'rating'.
+            limit (int): Maximum number of movies.
+            min_ratings (int): Ratings needed to rank by rating.
+
+        Returns:
+            list: Dicts with 'imdb_id', 'name', 'owner_count' and
+            'average_rating' keys, best first.
+        """
+        rows = heapq.merge(*(shard.iter_popularity()
+                             for shard in self.shards),
+                           key=itemgetter(0))
+
+        def merged():
+            for imdb_id, partials in groupby(rows, key=itemgetter(0)):
+                partials = list(partials)
+                owners = sum(row[2] for row in partials)
+                rating_sum = sum(row[3] for row in partials)
+                ratings = sum(row[4] for row in partials)
+                if order_by == 'rating' and ratings < min_ratings:
+                    continue
+                yield {
+                    'imdb_id': imdb_id,
+                    'name': partials[0][1],
+                    'owner_count': owners,
+                    'average_rating': rating_sum / ratings if ratings
+                    else None,
+                }
+
+        def average(movie):
+            # Unrated movies sort last, like NULLs in the SQL ordering
+            rating = movie['average_rating']
+            return (rating is None, -(rating or 0))
+
+        if order_by == 'rating':
+            def key(movie):
+                return (average(movie), -movie['owner_count'],
+                        movie['imdb_id'])
+        else:
+            def key(movie):
+                return (-movie['owner_count'], average(movie),
+                        movie['imdb_id'])
+        return heapq.nsmallest(limit, merged(), key=key)
+
+    def get_plots(self, imdb_ids):
+        """
+        Retrieve stored plots from the directory.
+
+        Args:
+            imdb_ids (iterable): IMDb IDs to look up.
+
+        Returns:
+            dict: Plot keyed by IMDb ID, for the IDs that are stored.
+        """
+        return self.directory.get_plots(imdb_ids)
+
+    def save_plots(self, plots):
+        """
+        Store plots in the directory.
+
+        Args:
+            plots (dict): Plot keyed by IMDb ID.
+        """
+        return self.directory.save_plots(plots)
+
+    def rebuild_stats(self):
+        """
+        Rebuild the statistics of every shard in parallel.
+
+        Returns:
+            int: Number of users with statistics.
+        """
+        return sum(self._fan_out(lambda shard: shard.rebuild_stats()))
@@ -1,9 +1,14 @@
+from collections import Counter
+from itertools import groupby
 from sqlalchemy import create_engine, Column, Integer, String, \
-    Float, ForeignKey
+    Float, ForeignKey, Index, insert, select, update, delete, case, \
+    func, or_, event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, scoped_session, \
     relationship, declarative_base
-from datamanager import DataManagerInterface
+from datamanager.data_manager_interface import DataManagerInterface
+from datamanager.records import UserRecord, MovieRecord
 
 Base = declarative_base()
 
@@ -20,7 +25,9 @@ class User(Base):
     __tablename__ = 'users'
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, nullable=False, unique=True)
-    movies = relationship("Movie", back_populates="user")
+    movies = relationship("Movie", back_populates="user",
+                          cascade="all, delete-orphan",
+                          passive_deletes=True)
 
 
 class Movie(Base):
@@ -42,21 +49,201 @@ class Movie(Base):
     director = Column(String, nullable=False)
     year = Column(Integer, nullable=False)
     rating = Column(Float)
-    user_id = Column(Integer, ForeignKey('users.id'))
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'),
+                     index=True)
     imdb_id = Column(String, nullable=False)
     user = relationship("User", back_populates="movies")
+    # Never reuse the ID of a deleted movie; links, cached reads and
+    # sharded global IDs may still refer to it
+    __table_args__ = {'sqlite_autoincrement': True}
+
+
+class CatalogTitle(Base):
+    """
+    Represents a title in the local offline catalog.
+
+    Attributes:
+        imdb_id (str): IMDb ID of the title.
+        title_type (str): IMDb title type, e.g. 'movie'.
+        primary_title (str): Popular title of the movie.
+        original_title (str): Title in the original language.
+        start_year (int): Year of release.
+        genres (str): Comma-separated list of genres.
+    """
+    __tablename__ = 'catalog_titles'
+    imdb_id = Column(String, primary_key=True)
+    title_type = Column(String)
+    primary_title = Column(String, nullable=False)
+    original_title = Column(String)
+    start_year = Column(Integer)
+    genres = Column(String)
+
+
+class UserStats(Base):
+    """
+    Running totals of a user's collection.
+
+    Attributes:
+        user_id (int): ID of the user.
+        movie_count (int): Number of movies in the collection.
+        rating_sum (float): Sum of all non-empty ratings.
+        rated_count (int): Number of movies with a rating.
+    """
+    __tablename__ = 'user_stats'
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'),
+                     primary_key=True)
+    movie_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    rated_count = Column(Integer, nullable=False, default=0)
+
+
+class UserDecadeCount(Base):
+    """
+    Number of movies per decade in a user's collection.
+
+    Attributes:
+        user_id (int): ID of the user.
+        decade (int): First year of the decade, e.g. 1970.
+        movie_count (int): Number of movies from that decade.
+    """
+    __tablename__ = 'user_decade_counts'
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'),
+                     primary_key=True)
+    decade = Column(Integer, primary_key=True)
+    movie_count = Column(Integer, nullable=False, default=0)
+
+
+class UserDirectorCount(Base):
+    """
+    Number of movies per director in a user's collection.
+
+    Attributes:
+        user_id (int): ID of the user.
+        director (str): Name of the director.
+        movie_count (int): Number of movies by that director.
+    """
+    __tablename__ = 'user_director_counts'
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'),
+                     primary_key=True)
+    director = Column(String, primary_key=True)
+    movie_count = Column(Integer, nullable=False, default=0)
+    __table_args__ = (
+        Index('ix_user_director_counts_top', 'user_id', 'movie_count'),
+    )
+
+
+class MoviePopularity(Base):
+    """
+    Site-wide counters per movie, across all collections.
+
+    Attributes:
+        imdb_id (str): IMDb ID of the movie.
+        name (str): Name of the movie when it was first added.
+        owner_count (int): Number of collections holding the movie.
+        rating_sum (float): Sum of all non-empty ratings.
+        rating_count (int): Number of non-empty ratings.
+        rating_avg (float): rating_sum / rating_count, kept for
+            index-ordered leaderboard reads.
+    """
+    __tablename__ = 'movie_popularity'
+    imdb_id = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+    owner_count = Column(Integer, nullable=False, default=0, index=True)
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    rating_avg = Column(Float, index=True)
+
+
+class MoviePlot(Base):
+    """
+    Plot summary of a movie, kept so pages do not ask OMDb again.
+
+    Attributes:
+        imdb_id (str): IMDb ID of the movie.
+        plot (str): Short plot from OMDb.
+    """
+    __tablename__ = 'movie_plots'
+    imdb_id = Column(String, primary_key=True)
+    plot = Column(String, nullable=False)
+
+
+def _movie_values(movie):
+    """
+    Capture the counter-relevant values of a Movie.
+
+    Args:
+        movie (Movie): ORM movie.
+
+    Returns:
+        dict: 'name', 'director', 'year', 'rating' and 'imdb_id'.
+    """
+    return {
+        'name': movie.name,
+        'director': movie.director,
+        'year': movie.year,
+        'rating': movie.rating,
+        'imdb_id': movie.imdb_id,
+    }
+
+
+def _enable_foreign_keys(dbapi_connection, connection_record):
+    """
+    Turn on foreign key enforcement, which SQLite leaves off by
+    default, so ON DELETE CASCADE takes effect.
+
+    Args:
+        dbapi_connection: New sqlite3 connection.
+        connection_record: Pool record of the connection.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def split_directors(director):
+    """
+    Split an OMDb director field into individual names.
+
+    Args:
+        director (str): e.g. 'Lana Wachowski, Lilly Wachowski'.
+
+    Returns:
+        list: Director names, without 'N/A' or empty entries.
+    """
+    return [name.strip() for name in (director or "").split(",")
+            if name.strip() and name.strip() != "N/A"]
+
+
+# Columns selected by the read-only listing path, in record order
+USER_COLUMNS = (User.id, User.name)
+MOVIE_COLUMNS = (Movie.id, Movie.name, Movie.director, Movie.year,
+                 Movie.rating, Movie.user_id, Movie.imdb_id)
+
+SORT_COLUMNS = {
+    'name_asc': (func.lower(Movie.name), False),
+    'name_desc': (func.lower(Movie.name), True),
+    'year_asc': (Movie.year, False),
+    'year_desc': (Movie.year, True),
+    'rating_asc': (func.coalesce(Movie.rating, 0), False),
+    'rating_desc': (func.coalesce(Movie.rating, 0), True),
+}
 
 
 class SQLiteDataManager(DataManagerInterface):
-    def __init__(self, db_file_name):
+    def __init__(self, db_file_name, tables=None):
         """
         Initialize SQLiteDataManager.
 
         Args:
             db_file_name (str): SQLite database file name.
+            tables (list, optional): Tables this database holds, e.g.
+                only the users for a directory database. Defaults to
+                every table.
         """
         self.engine = create_engine(f'sqlite:///{db_file_name}')
-        Base.metadata.create_all(self.engine)
+        event.listen(self.engine, "connect", _enable_foreign_keys)
+        self.tables = list(tables or Base.metadata.sorted_tables)
+        Base.metadata.create_all(self.engine, tables=self.tables)
         self.Session = scoped_session(sessionmaker(bind=self.engine))
 
     def get_all_users(self):
@@ -64,16 +251,14 @@ class SQLiteDataManager(DataManagerInterface):
         Retrieve all users from the database.
 
         Returns:
-            list: List of User objects.
+            list: List of UserRecord objects.
         """
-        session = self.Session()
         try:
-            return session.query(User).all()
+            return self._records(UserRecord,
+                                 select(*USER_COLUMNS).order_by(User.id))
         except SQLAlchemyError as e:
             print(f"Error getting all users: {e}")
             return []
-        finally:
-            session.close()
 
     def get_user_movies(self, user_id):
         """
@@ -83,29 +268,231 @@ class SQLiteDataManager(DataManagerInterface):
             user_id (int): ID of the user.
 
         Returns:
-            list: List of Movie objects.
+            list: List of MovieRecord objects.
         """
-        session = self.Session()
         try:
-            user = session.query(User).filter(
-                User.id == user_id).first()
-            return user.movies if user else []
+            return self._records(MovieRecord, select(*MOVIE_COLUMNS).where(
+                Movie.user_id == user_id).order_by(Movie.id))
         except SQLAlchemyError as e:
             print(f"Error getting user movies: {e}")
             return []
+
+    def get_user(self, user_id):
+        """
+        Retrieve a single user.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            UserRecord: The user, or None if it does not exist.
+        """
+        try:
+            return self._record(UserRecord, select(*USER_COLUMNS).where(
+                User.id == user_id))
+        except SQLAlchemyError as e:
+            print(f"Error getting user: {e}")
+            return None
+
+    def get_user_by_name(self, user_name):
+        """
+        Retrieve a user by name, ignoring case.
+
+        Args:
+            user_name (str): Name of the user.
+
+        Returns:
+            UserRecord: The user, or None if it does not exist.
+        """
+        try:
+            return self._record(UserRecord, select(*USER_COLUMNS).where(
+                func.lower(User.name) == user_name.lower()))
+        except SQLAlchemyError as e:
+            print(f"Error getting user by name: {e}")
+            return None
+
+    def find_user_movies(self, user_id, search='', sort='name_asc',
+                         offset=0, limit=None):
+        """
+        Search, sort and paginate a user's movies in SQL.
+
+        Args:
+            user_id (int): ID of the user.
+            search (str): Text matched against title and director.
+            sort (str): One of SORT_OPTIONS.
+            offset (int): Number of matching movies to skip.
+            limit (int, optional): Maximum number of movies.
+
+        Returns:
+            list: List of MovieRecord objects.
+        """
+        column, descending = SORT_COLUMNS.get(sort, SORT_COLUMNS[
+            'name_asc'])
+        query = select(*MOVIE_COLUMNS).where(Movie.user_id == user_id)
+        if search:
+            query = query.where(or_(
+                Movie.name.icontains(search, autoescape=True),
+                Movie.director.icontains(search, autoescape=True)))
+        query = query.order_by(column.desc() if descending else column,
+                               Movie.id).offset(offset).limit(limit)
+
+        try:
+            return self._records(MovieRecord, query)
+        except SQLAlchemyError as e:
+            print(f"Error finding user movies: {e}")
+            return []
+
+    def get_movie(self, user_id, movie_id):
+        """
+        Retrieve a movie from a user's collection.
+
+        Args:
+            user_id (int): ID of the user.
+            movie_id (int): ID of the movie.
+
+        Returns:
+            MovieRecord: The movie, or None if the user does not own it.
+        """
+        try:
+            return self._record(MovieRecord, select(*MOVIE_COLUMNS).where(
+                Movie.id == movie_id, Movie.user_id == user_id))
+        except SQLAlchemyError as e:
+            print(f"Error getting movie: {e}")
+            return None
+
+    def get_movie_owner(self, movie_id):
+        """
+        Find the user whose collection holds a movie.
+
+        Args:
+            movie_id (int): ID of the movie.
+
+        Returns:
+            int: ID of the owner, or None if the movie does not exist.
+        """
+        try:
+            with self.engine.connect() as connection:
+                return connection.execute(select(Movie.user_id).where(
+                    Movie.id == movie_id)).scalar()
+        except SQLAlchemyError as e:
+            print(f"Error getting movie owner: {e}")
+            return None
+
+    def has_movie(self, user_id, imdb_id, title):
+        """
+        Check whether a user already has a movie.
+
+        Args:
+            user_id (int): ID of the user.
+            imdb_id (str): IMDb ID of the movie.
+            title (str): Title of the movie, compared ignoring case.
+
+        Returns:
+            bool: True if either the IMDb ID or the title matches.
+        """
+        session = self.Session()
+        try:
+            return session.scalar(select(Movie.id).where(
+                Movie.user_id == user_id,
+                or_(Movie.imdb_id == imdb_id,
+                    func.lower(Movie.name) == title.lower())
+            ).limit(1)) is not None
+        except SQLAlchemyError as e:
+            print(f"Error checking movie: {e}")
+            return False
+        finally:
+            session.close()
+
+    def iter_user_movies(self, user_id, batch_size=500):
+        """
+        Stream a user's movies without loading them all at once.
+
+        Rows are fetched through a server-side cursor in batches of
+        batch_size, so memory use does not grow with the collection.
+
+        Args:
+            user_id (int): ID of the user.
+            batch_size (int): Number of rows fetched per round-trip.
+
+        Yields:
+            Row: Rows with name, director, year, rating and imdb_id.
+        """
+        session = self.Session()
+        try:
+            result = session.execute(
+                select(Movie.name, Movie.director, Movie.year,
+                       Movie.rating, Movie.imdb_id)
+                .where(Movie.user_id == user_id)
+                .order_by(Movie.id)
+                .execution_options(yield_per=batch_size))
+            yield from result
+        except SQLAlchemyError as e:
+            print(f"Error streaming user movies: {e}")
         finally:
             session.close()
 
-    def add_user(self, user_name):
+    def iter_ratings(self, batch_size=1000):
+        """
+        Stream every user's movies for cross-user analysis.
+
+        Args:
+            batch_size (int): Number of rows fetched per round-trip.
+
+        Yields:
+            Row: (user_id, imdb_id, name, rating) rows.
+        """
+        session = self.Session()
+        try:
+            result = session.execute(
+                select(Movie.user_id, Movie.imdb_id, Movie.name,
+                       Movie.rating)
+                .where(Movie.user_id.is_not(None))
+                .execution_options(yield_per=batch_size))
+            yield from result
+        except SQLAlchemyError as e:
+            print(f"Error streaming ratings: {e}")
+        finally:
+            session.close()
+
+    def iter_popularity(self, batch_size=1000):
+        """
+        Stream the raw popularity counters in IMDb ID order, e.g. to
+        merge them with counters kept in other databases.
+
+        Args:
+            batch_size (int): Number of rows fetched per round-trip.
+
+        Yields:
+            Row: (imdb_id, name, owner_count, rating_sum, rating_count)
+            rows.
+        """
+        session = self.Session()
+        try:
+            result = session.execute(
+                select(MoviePopularity.imdb_id, MoviePopularity.name,
+                       MoviePopularity.owner_count,
+                       MoviePopularity.rating_sum,
+                       MoviePopularity.rating_count)
+                .order_by(MoviePopularity.imdb_id)
+                .execution_options(yield_per=batch_size))
+            yield from result
+        except SQLAlchemyError as e:
+            print(f"Error streaming popularity: {e}")
+        finally:
+            session.close()
+
+    def add_user(self, user_name, user_id=None):
         """
         Add a new user to the database.
 
         Args:
             user_name (str): Name of the user.
+            user_id (int, optional): ID to store the user under, e.g.
+                when mirroring a user from another database.
         """
         session = self.Session()
         try:
-            new_user = User(name=user_name)
+            new_user = User(id=user_id, name=user_name)
             session.add(new_user)
             session.commit()
         except SQLAlchemyError as e:
@@ -136,6 +523,8 @@ class SQLiteDataManager(DataManagerInterface):
                 imdb_id=imdb_id
             )
             session.add(new_movie)
+            self._record_movies(session, user_id,
+                                [_movie_values(new_movie)])
             session.commit()
         except SQLAlchemyError as e:
             print(f"Error adding movie: {e}")
@@ -143,6 +532,67 @@ class SQLiteDataManager(DataManagerInterface):
         finally:
             session.close()
 
+    def add_movies(self, user_id, movies):
+        """
+        Add many movies for a user in a single transaction.
+
+        Args:
+            user_id (int): ID of the user.
+            movies (list): Dicts with 'title', 'director', 'year',
+                           'rating' and 'imdb_id' keys.
+
+        Returns:
+            int: Number of movies added.
+        """
+        if not movies:
+            return 0
+        rows = [
+            {
+                'name': movie['title'].title(),
+                'director': movie['director'],
+                'year': movie['year'],
+                'rating': movie['rating'],
+                'user_id': user_id,
+                'imdb_id': movie['imdb_id'],
+            }
+            for movie in movies
+        ]
+        session = self.Session()
+        try:
+            session.execute(insert(Movie), rows)
+            self._record_movies(session, user_id, rows)
+            session.commit()
+            return len(rows)
+        except SQLAlchemyError as e:
+            print(f"Error adding movies: {e}")
+            session.rollback()
+            return 0
+        finally:
+            session.close()
+
+    def get_movie_keys(self, user_id):
+        """
+        Retrieve the identifying keys of a user's movies.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            tuple: Set of IMDb IDs and set of lower-cased titles.
+        """
+        session = self.Session()
+        try:
+            rows = session.execute(
+                select(Movie.imdb_id, Movie.name).where(
+                    Movie.user_id == user_id)).all()
+            return ({imdb_id for imdb_id, _ in rows},
+                    {name.lower() for _, name in rows})
+        except SQLAlchemyError as e:
+            print(f"Error getting movie keys: {e}")
+            return set(), set()
+        finally:
+            session.close()
+
     def update_movie(self, movie_id, title=None, director=None,
                      year=None, rating=None):
         """
@@ -160,6 +610,7 @@ class SQLiteDataManager(DataManagerInterface):
             movie = session.query(Movie).filter(
                 Movie.id == movie_id).first()
             if movie:
+                old = _movie_values(movie)
                 if title:
                     movie.name = title
                 if director:
@@ -168,6 +619,11 @@ class SQLiteDataManager(DataManagerInterface):
                     movie.year = year
                 if rating:
                     movie.rating = rating
+                new = _movie_values(movie)
+                if new != old:
+                    self._record_movies(session, movie.user_id, [old],
+                                        sign=-1)
+                    self._record_movies(session, movie.user_id, [new])
                 session.commit()
         except SQLAlchemyError as e:
             print(f"Error updating movie: {e}")
@@ -187,6 +643,8 @@ class SQLiteDataManager(DataManagerInterface):
             movie = session.query(Movie).filter(
                 Movie.id == movie_id).first()
             if movie:
+                self._record_movies(session, movie.user_id,
+                                    [_movie_values(movie)], sign=-1)
                 session.delete(movie)
                 session.commit()
         except SQLAlchemyError as e:
@@ -195,5 +653,393 @@ class SQLiteDataManager(DataManagerInterface):
         finally:
             session.close()
 
+    def delete_user(self, user_id):
+        """
+        Delete a user, their movies and everything derived from them.
+
+        Runs as a fixed number of set-based statements in one
+        transaction, however large the collection is.
+
+        Args:
+            user_id (int): ID of the user to delete.
+
+        Returns:
+            bool: True if the user was deleted.
+        """
+        session = self.Session()
+        try:
+            if self._holds(Movie):
+                self._remove_popularity(session, user_id)
+            # ON DELETE CASCADE covers these, but databases created
+            # before the constraint existed still need explicit deletes
+            for model in (Movie, UserStats, UserDecadeCount,
+                          UserDirectorCount):
+                if self._holds(model):
+                    session.execute(delete(model).where(
+                        model.user_id == user_id))
+            deleted = session.execute(delete(User).where(
+                User.id == user_id)).rowcount
+            session.commit()
+            return deleted > 0
+        except SQLAlchemyError as e:
+            print(f"Error deleting user: {e}")
+            session.rollback()
+            return False
+        finally:
+            session.close()
+
+    def get_user_stats(self, user_id, top_directors=5):
+        """
+        Retrieve the precomputed statistics of a user's collection.
+
+        Args:
+            user_id (int): ID of the user.
+            top_directors (int): Number of directors to include.
+
+        Returns:
+            dict: 'movie_count', 'average_rating', 'decades' as
+            (decade, count) pairs and 'top_directors' as
+            (director, count) pairs.
+        """
+        session = self.Session()
+        try:
+            totals = session.get(UserStats, user_id)
+            decades = session.execute(
+                select(UserDecadeCount.decade,
+                       UserDecadeCount.movie_count)
+                .where(UserDecadeCount.user_id == user_id)
+                .order_by(UserDecadeCount.decade)).all()
+            directors = session.execute(
+                select(UserDirectorCount.director,
+                       UserDirectorCount.movie_count)
+                .where(UserDirectorCount.user_id == user_id)
+                .order_by(UserDirectorCount.movie_count.desc(),
+                          UserDirectorCount.director)
+                .limit(top_directors)).all()
+            return {
+                'movie_count': totals.movie_count if totals else 0,
+                'average_rating':
+                    totals.rating_sum / totals.rated_count
+                    if totals and totals.rated_count else None,
+                'decades': [tuple(row) for row in decades],
+                'top_directors': [tuple(row) for row in directors],
+            }
+        except SQLAlchemyError as e:
+            print(f"Error getting user stats: {e}")
+            return {'movie_count': 0, 'average_rating': None,
+                    'decades': [], 'top_directors': []}
+        finally:
+            session.close()
+
+    def get_popular_movies(self, order_by='owners', limit=25,
+                           min_ratings=1):
+        """
+        Retrieve the site-wide most collected or highest rated movies.
+
+        Args:
+            order_by (str): 'owners' for most collected, 'rating' for
+                highest average rating.
+            limit (int): Maximum number of movies.
+            min_ratings (int): Minimum number of ratings a movie needs
+                to appear when ordering by rating.
+
+        Returns:
+            list: Dicts with 'imdb_id', 'name', 'owner_count' and
+            'average_rating' keys, best first.
+        """
+        query = select(MoviePopularity)
+        if order_by == 'rating':
+            query = query.where(
+                MoviePopularity.rating_count >= min_ratings).order_by(
+                MoviePopularity.rating_avg.desc(),
+                MoviePopularity.owner_count.desc(),
+                MoviePopularity.imdb_id)
+        else:
+            query = query.order_by(MoviePopularity.owner_count.desc(),
+                                   MoviePopularity.rating_avg.desc(),
+                                   MoviePopularity.imdb_id)
+
+        session = self.Session()
+        try:
+            return [
+                {
+                    'imdb_id': movie.imdb_id,
+                    'name': movie.name,
+                    'owner_count': movie.owner_count,
+                    'average_rating': movie.rating_avg,
+                }
+                for movie in session.scalars(query.limit(limit))
+            ]
+        except SQLAlchemyError as e:
+            print(f"Error getting popular movies: {e}")
+            return []
+        finally:
+            session.close()
+
+    def get_plots(self, imdb_ids):
+        """
+        Retrieve stored plots with a single primary key lookup.
+
+        Args:
+            imdb_ids (iterable): IMDb IDs to look up.
+
+        Returns:
+            dict: Plot keyed by IMDb ID, for the IDs that are stored.
+        """
+        imdb_ids = list(imdb_ids)
+        if not imdb_ids:
+            return {}
+        session = self.Session()
+        try:
+            return dict(session.execute(
+                select(MoviePlot.imdb_id, MoviePlot.plot).where(
+                    MoviePlot.imdb_id.in_(imdb_ids))).all())
+        except SQLAlchemyError as e:
+            print(f"Error getting plots: {e}")
+            return {}
+        finally:
+            session.close()
+
+    def save_plots(self, plots):
+        """
+        Store plots, replacing any stored before.
+
+        Args:
+            plots (dict): Plot keyed by IMDb ID.
+        """
+        if not plots:
+            return
+        session = self.Session()
+        try:
+            stmt = sqlite_insert(MoviePlot)
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=['imdb_id'],
+                set_={'plot': stmt.excluded.plot}),
+                [{'imdb_id': imdb_id, 'plot': plot}
+                 for imdb_id, plot in plots.items()])
+            session.commit()
+        except SQLAlchemyError as e:
+            print(f"Error saving plots: {e}")
+            session.rollback()
+        finally:
+            session.close()
+
+    def rebuild_stats(self):
+        """
+        Recompute user statistics and movie popularity from the
+        movies table.
+
+        Returns:
+            int: Number of users with statistics after the rebuild.
+        """
+        session = self.Session()
+        try:
+            for model in (UserStats, UserDecadeCount, UserDirectorCount,
+                          MoviePopularity):
+                session.execute(delete(model))
+            rows = session.execute(
+                select(Movie.user_id, Movie.name, Movie.director,
+                       Movie.year, Movie.rating, Movie.imdb_id)
+                .where(Movie.user_id.is_not(None))
+                .order_by(Movie.user_id)
+                .execution_options(yield_per=1000))
+            users = 0
+            for user_id, movies in groupby(rows, key=lambda r: r[0]):
+                self._record_movies(session, user_id,
+                                    [row._asdict() for row in movies])
+                users += 1
+            session.commit()
+            return users
+        except SQLAlchemyError as e:
+            print(f"Error rebuilding stats: {e}")
+            session.rollback()
+            return 0
+        finally:
+            session.close()
+
+    def _record_movies(self, session, user_id, movies, sign=1):
+        """
+        Update every derived counter for movies added or removed.
+
+        Runs inside the caller's transaction so the counters always
+        match the movies that were written.
+
+        Args:
+            session (Session): Active session of the write.
+            user_id (int): ID of the owning user.
+            movies (list): Dicts with 'name', 'director', 'year',
+                'rating' and 'imdb_id' keys.
+            sign (int): 1 when adding movies, -1 when removing.
+        """
+        if not movies or user_id is None:
+            return
+        self._apply_stats(session, user_id, movies, sign)
+        self._apply_popularity(session, movies, sign)
+
+    @staticmethod
+    def _apply_stats(session, user_id, movies, sign=1):
+        """
+        Add (or with sign=-1, remove) movies to a user's statistics.
+
+        Args:
+            session (Session): Active session of the write.
+            user_id (int): ID of the user.
+            movies (list): Movie value dicts.
+            sign (int): 1 when adding movies, -1 when removing.
+        """
+        ratings = [movie['rating'] for movie in movies
+                   if movie['rating'] is not None]
+
+        stmt = sqlite_insert(UserStats).values(
+            user_id=user_id, movie_count=sign * len(movies),
+            rating_sum=sign * sum(ratings),
+            rated_count=sign * len(ratings))
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=['user_id'],
+            set_={
+                'movie_count': UserStats.movie_count +
+                stmt.excluded.movie_count,
+                'rating_sum': UserStats.rating_sum +
+                stmt.excluded.rating_sum,
+                'rated_count': UserStats.rated_count +
+                stmt.excluded.rated_count,
+            }))
+
+        decades = Counter(movie['year'] // 10 * 10 for movie in movies
+                          if movie['year'] is not None)
+        directors = Counter(name for movie in movies
+                            for name in split_directors(
+                                movie['director']))
+        for model, key, counts in (
+                (UserDecadeCount, 'decade', decades),
+                (UserDirectorCount, 'director', directors)):
+            if not counts:
+                continue
+            stmt = sqlite_insert(model)
+            session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=['user_id', key],
+                    set_={'movie_count': model.movie_count +
+                          stmt.excluded.movie_count}),
+                [{'user_id': user_id, key: value,
+                  'movie_count': sign * count}
+                 for value, count in counts.items()])
+            if sign < 0:
+                session.execute(delete(model).where(
+                    model.user_id == user_id, model.movie_count <= 0))
+
+    @staticmethod
+    def _apply_popularity(session, movies, sign=1):
+        """
+        Add (or with sign=-1, remove) movies to the popularity counters.
+
+        Args:
+            session (Session): Active session of the write.
+            movies (list): Movie value dicts.
+            sign (int): 1 when adding movies, -1 when removing.
+        """
+        totals = {}
+        for movie in movies:
+            entry = totals.setdefault(movie['imdb_id'], {
+                'imdb_id': movie['imdb_id'], 'name': movie['name'],
+                'owner_count': 0, 'rating_sum': 0.0, 'rating_count': 0})
+            entry['owner_count'] += sign
+            if movie['rating'] is not None:
+                entry['rating_sum'] += sign * movie['rating']
+                entry['rating_count'] += sign
+
+        stmt = sqlite_insert(MoviePopularity)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=['imdb_id'],
+            set_={
+                'owner_count': MoviePopularity.owner_count +
+                stmt.excluded.owner_count,
+                'rating_sum': MoviePopularity.rating_sum +
+                stmt.excluded.rating_sum,
+                'rating_count': MoviePopularity.rating_count +
+                stmt.excluded.rating_count,
+            }), list(totals.values()))
+
+        affected = MoviePopularity.imdb_id.in_(list(totals))
+        if sign < 0:
+            session.execute(delete(MoviePopularity).where(
+                affected, MoviePopularity.owner_count <= 0))
+        session.execute(update(MoviePopularity).where(affected).values(
+            rating_avg=case(
+                (MoviePopularity.rating_count > 0,
+                 MoviePopularity.rating_sum /
+                 MoviePopularity.rating_count),
+                else_=None)))
+
+    def _holds(self, model):
+        """
+        Check whether this database has the table of a model.
+        """
+        return model.__table__ in self.tables
+
+    def _records(self, record, query):
+        """
+        Run a Core select outside the ORM and wrap its rows.
+
+        Skips the session, identity map and entity hydration, which
+        listing pages do not need.
+
+        Args:
+            record (type): Namedtuple matching the selected columns.
+            query (Select): Statement to run.
+
+        Returns:
+            list: One record per row.
+        """
+        with self.engine.connect() as connection:
+            return list(map(record._make, connection.execute(query)))
+
+    def _record(self, record, query):
+        """
+        Run a Core select and wrap its first row.
+
+        Args:
+            record (type): Namedtuple matching the selected columns.
+            query (Select): Statement to run.
+
+        Returns:
+            tuple: The record, or None if there is no row.
+        """
+        rows = self._records(record, query.limit(1))
+        return rows[0] if rows else None
+
+    @staticmethod
+    def _remove_popularity(session, user_id):
+        """
+        Subtract a whole collection from the popularity counters.
+
+        Args:
+            session (Session): Active session of the write.
+            user_id (int): ID of the user whose movies are removed.
+        """
+        owned = select(
+            Movie.imdb_id,
+            func.count().label('owners'),
+            func.coalesce(func.sum(Movie.rating), 0.0).label('rating_sum'),
+            func.count(Movie.rating).label('ratings'),
+        ).where(Movie.user_id == user_id).group_by(
+            Movie.imdb_id).subquery()
+        session.execute(update(MoviePopularity).where(
+            MoviePopularity.imdb_id == owned.c.imdb_id).values(
+            owner_count=MoviePopularity.owner_count - owned.c.owners,
+            rating_sum=MoviePopularity.rating_sum - owned.c.rating_sum,
+            rating_count=MoviePopularity.rating_count - owned.c.ratings))
+
+        affected = MoviePopularity.imdb_id.in_(
+            select(Movie.imdb_id).where(Movie.user_id == user_id))
+        session.execute(delete(MoviePopularity).where(
+            affected, MoviePopularity.owner_count <= 0))
+        session.execute(update(MoviePopularity).where(affected).values(
+            rating_avg=case(
+                (MoviePopularity.rating_count > 0,
+                 MoviePopularity.rating_sum /
+                 MoviePopularity.rating_count),
+                else_=None)))
+
 
 Base = Base
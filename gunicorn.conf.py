@@ -0,0 +1,27 @@
+import multiprocessing
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+preload_app = True
+worker_class = 'gthread'
+threads = int(os.getenv('THREADS', 4))
+timeout = 30
+
+# The in-memory data manager lives in a single process, so workers
+# would each see a different copy of the collections
+if os.getenv('DATA_MANAGER', 'sqlite') == 'memory':
+    workers = 1
+else:
+    workers = int(os.getenv('WEB_CONCURRENCY',
+                            multiprocessing.cpu_count() * 2 + 1))
+
+# Every worker keeps its own read cache, and a write only invalidates
+# the cache of the worker that made it. With several workers the next
+# request may land on another worker and show stale data, so reads go
+# straight to the database instead. Set the worker count through
+# WEB_CONCURRENCY rather than --workers so this check sees it.
+if workers > 1:
+    os.environ['READ_CACHE_SIZE'] = '0'
@@ -0,0 +1,2 @@
+from .collection import CollectionImporter, ImportResult, \
+    iter_collection, detect_format, open_text
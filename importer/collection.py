@@ -0,0 +1,391 @@
+import csv
+import io
+import json
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+from api import make_api_request, fetch_movies_by_id, extract_plot
+
+READ_SIZE = 64 * 1024
+IMDB_ID_PATTERN = re.compile(r"tt\d{7,}")
+
+CollectionEntry = namedtuple(
+    "CollectionEntry", ["imdb_id", "title", "year", "rating", "director"])
+
+# Column names used by IMDb, Letterboxd and generic exports, lower-cased
+IMDB_ID_COLUMNS = ("const", "imdb_id", "imdbid", "imdb id", "tconst")
+TITLE_COLUMNS = ("title", "name", "primarytitle")
+YEAR_COLUMNS = ("year", "release year", "startyear")
+RATING_COLUMNS = ("your rating", "rating", "imdb rating", "imdbrating")
+DIRECTOR_COLUMNS = ("directors", "director")
+
+
+class ImportResult:
+    """
+    Running totals of a collection import.
+
+    Attributes:
+        processed (int): Entries read from the file.
+        added (int): Movies added to the collection.
+        duplicates (int): Entries already in the collection.
+        unresolved (int): Entries that could not be matched.
+    """
+
+    def __init__(self):
+        self.processed = 0
+        self.added = 0
+        self.duplicates = 0
+        self.unresolved = 0
+
+    def __repr__(self):
+        return (f"ImportResult(processed={self.processed}, "
+                f"added={self.added}, duplicates={self.duplicates}, "
+                f"unresolved={self.unresolved})")
+
+
+def _first(record, columns):
+    """
+    Return the first non-empty value among the given columns.
+    """
+    for column in columns:
+        value = record.get(column)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _to_int(value):
+    try:
+        return int(str(value)[:4])
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_record(record):
+    """
+    Map an exported row onto a CollectionEntry.
+
+    Args:
+        record (dict): A row from a CSV or JSON export.
+
+    Returns:
+        CollectionEntry: Normalized entry, or None if the row has
+        neither a title nor an IMDb ID.
+    """
+    record = {str(key).strip().lower(): value
+              for key, value in record.items() if key is not None}
+
+    imdb_id = _first(record, IMDB_ID_COLUMNS)
+    if not imdb_id:
+        # Fall back to any column holding an IMDb URL
+        for value in record.values():
+            match = IMDB_ID_PATTERN.search(str(value))
+            if match:
+                imdb_id = match.group(0)
+                break
+
+    title = _first(record, TITLE_COLUMNS)
+    if not imdb_id and not title:
+        return None
+
+    rating = _to_float(_first(record, RATING_COLUMNS))
+    if rating is not None and "letterboxd uri" in record:
+        # Letterboxd rates on a 0.5-5 star scale
+        rating *= 2
+
+    return CollectionEntry(
+        imdb_id=str(imdb_id).strip() if imdb_id else None,
+        title=str(title).strip() if title else None,
+        year=_to_int(_first(record, YEAR_COLUMNS)),
+        rating=rating,
+        director=_first(record, DIRECTOR_COLUMNS),
+    )
+
+
+def iter_json_records(stream):
+    """
+    Stream objects from a JSON array or newline-delimited JSON.
+
+    Args:
+        stream (file): Text stream positioned at the start.
+
+    Yields:
+        dict: One decoded object at a time.
+
+    Raises:
+        ValueError: If an element is malformed or the array is not
+            closed.
+    """
+    decoder = json.JSONDecoder()
+    start = stream.read(READ_SIZE)
+    buffer = start.lstrip()
+    # Characters consumed before the start of buffer, for error messages
+    offset = len(start) - len(buffer)
+
+    if buffer.startswith("["):
+        buffer = buffer[1:]
+        offset += 1
+        element = 0
+        while True:
+            stripped = buffer.lstrip().lstrip(",").lstrip()
+            offset += len(buffer) - len(stripped)
+            buffer = stripped
+            if buffer.startswith("]"):
+                return
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as e:
+                more = stream.read(READ_SIZE)
+                if not more:
+                    raise ValueError(
+                        f"Malformed JSON array element {element + 1} "
+                        f"at character {offset + e.pos}: {e.msg}")
+                buffer += more
+                continue
+            yield record
+            element += 1
+            buffer = buffer[end:]
+            offset += end
+
+    pending = ""
+    for piece in chain([buffer], iter(lambda: stream.read(READ_SIZE),
+                                      "")):
+        pending += piece
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if pending.strip():
+        yield json.loads(pending)
+
+
+def iter_collection(stream, file_format="csv"):
+    """
+    Stream normalized entries from a collection export.
+
+    Args:
+        stream (file): Text stream of the export.
+        file_format (str): 'csv' or 'json' (array or NDJSON).
+
+    Yields:
+        CollectionEntry: Entries that carry a title or IMDb ID.
+    """
+    if file_format == "json":
+        records = iter_json_records(stream)
+    else:
+        records = csv.DictReader(stream)
+
+    for record in records:
+        if isinstance(record, dict):
+            entry = normalize_record(record)
+            if entry:
+                yield entry
+
+
+def detect_format(filename):
+    """
+    Guess the export format from a file name.
+
+    Args:
+        filename (str): Name of the uploaded or local file.
+
+    Returns:
+        str: 'json' for .json/.jsonl/.ndjson files, 'csv' otherwise.
+    """
+    name = (filename or "").lower()
+    if name.endswith((".json", ".jsonl", ".ndjson")):
+        return "json"
+    return "csv"
+
+
+def open_text(binary_stream):
+    """
+    Wrap a binary stream (e.g. an upload) for text parsing.
+    """
+    return io.TextIOWrapper(binary_stream, encoding="utf-8-sig",
+                            newline="")
+
+
+class CollectionImporter:
+    """
+    Resolve and insert a collection export in batches.
+
+    Titles without an IMDb ID are matched against the local catalog
+    first and OMDb second. Details are fetched concurrently, lookups
+    are cached for the duration of the import, and every batch is
+    written in a single transaction.
+    """
+
+    def __init__(self, data_manager, catalog=None, batch_size=200,
+                 max_workers=8):
+        """
+        Initialize the importer.
+
+        Args:
+            data_manager (SQLiteDataManager): Target data manager.
+            catalog (Catalog, optional): Local catalog for matching.
+            batch_size (int): Entries resolved and written together.
+            max_workers (int): Maximum parallel OMDb requests.
+        """
+        self.data_manager = data_manager
+        self.catalog = catalog
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self._title_cache = {}
+        self._details_cache = {}
+
+    def run(self, user_id, entries, progress=None):
+        """
+        Import entries into a user's collection.
+
+        Args:
+            user_id (int): ID of the user.
+            entries (iterable): CollectionEntry objects.
+            progress (callable, optional): Called with the
+                ImportResult after every batch.
+
+        Returns:
+            ImportResult: Totals for the whole import.
+        """
+        result = ImportResult()
+        known_ids, known_titles = self.data_manager.get_movie_keys(
+            user_id)
+        entries = iter(entries)
+
+        while True:
+            batch = list(islice(entries, self.batch_size))
+            if not batch:
+                break
+            result.processed += len(batch)
+
+            # Entries already in the collection need no lookups at all
+            pending = []
+            for entry in batch:
+                if entry.imdb_id in known_ids or (
+                        not entry.imdb_id and
+                        entry.title.lower() in known_titles):
+                    result.duplicates += 1
+                else:
+                    pending.append(entry)
+
+            rows = []
+            for entry, imdb_id, details in self._resolve(pending,
+                                                         known_ids):
+                if not imdb_id:
+                    result.unresolved += 1
+                    continue
+                if imdb_id in known_ids:
+                    result.duplicates += 1
+                    continue
+                row = self._build_row(entry, imdb_id, details)
+                if row is None:
+                    result.unresolved += 1
+                    continue
+                title_key = row['title'].lower()
+                if title_key in known_titles:
+                    result.duplicates += 1
+                    continue
+                known_ids.add(imdb_id)
+                known_titles.add(title_key)
+                rows.append(row)
+
+            result.added += self.data_manager.add_movies(user_id, rows)
+            plots = {row['imdb_id']: extract_plot(
+                self._details_cache.get(row['imdb_id'])) for row in rows}
+            self.data_manager.save_plots(
+                {imdb_id: plot for imdb_id, plot in plots.items() if plot})
+            if progress:
+                progress(result)
+
+        return result
+
+    def _resolve(self, batch, known_ids=()):
+        """
+        Resolve IMDb IDs and details for one batch.
+
+        Args:
+            batch (list): CollectionEntry objects.
+            known_ids (set): IMDb IDs already in the collection; their
+                details are not fetched.
+
+        Returns:
+            list: (entry, imdb_id, details) tuples in batch order.
+        """
+        missing_titles = {(entry.title, entry.year) for entry in batch
+                          if not entry.imdb_id and
+                          (entry.title, entry.year)
+                          not in self._title_cache}
+        if missing_titles:
+            with ThreadPoolExecutor(
+                    max_workers=min(self.max_workers,
+                                    len(missing_titles))) as pool:
+                for key, imdb_id in zip(
+                        missing_titles,
+                        pool.map(lambda k: self._match_title(*k),
+                                 missing_titles)):
+                    self._title_cache[key] = imdb_id
+
+        ids = [entry.imdb_id or self._title_cache[(entry.title,
+                                                   entry.year)]
+               for entry in batch]
+        to_fetch = {imdb_id for imdb_id in ids
+                    if imdb_id and imdb_id not in known_ids and
+                    imdb_id not in self._details_cache}
+        if to_fetch:
+            fetched = fetch_movies_by_id(to_fetch, self.max_workers)
+            for imdb_id in to_fetch:
+                self._details_cache[imdb_id] = fetched.get(imdb_id)
+
+        return [(entry, imdb_id, self._details_cache.get(imdb_id))
+                for entry, imdb_id in zip(batch, ids)]
+
+    def _match_title(self, title, year):
+        """
+        Find the IMDb ID of the candidate matching a title and year.
+
+        Returns:
+            str: The IMDb ID, or None if no candidate matches, so the
+            entry is reported as unresolved instead of importing an
+            unrelated film.
+        """
+        candidates = self.catalog.search(title) if self.catalog else []
+        if not candidates:
+            candidates = make_api_request(title) or []
+
+        wanted = title.lower()
+        for candidate in candidates:
+            if candidate.get("Title", "").lower() != wanted:
+                continue
+            if year is None or _to_int(candidate.get("Year")) == year:
+                return candidate.get("imdbID")
+        return None
+
+    @staticmethod
+    def _build_row(entry, imdb_id, details):
+        """
+        Merge file values with OMDb details into an insertable row.
+        """
+        details = details or {}
+        title = details.get("Title") or entry.title
+        year = _to_int(details.get("Year")) or entry.year
+        if not title or year is None:
+            return None
+        rating = entry.rating
+        if rating is None:
+            rating = _to_float(details.get("imdbRating"))
+        return {
+            'title': title,
+            'director': details.get("Director") or entry.director
+            or "Unknown",
+            'year': year,
+            'rating': rating,
+            'imdb_id': imdb_id,
+        }
@@ -0,0 +1,3 @@
+from .refresh import PeriodicSnapshot
+from .taste import TasteIndex, build_taste_index
+from .leaderboard import Leaderboard
@@ -0,0 +1,61 @@
+from recommender.refresh import PeriodicSnapshot
+
+
+class Leaderboard(PeriodicSnapshot):
+    """
+    Site-wide most collected and highest rated movies.
+
+    The data manager maintains per-movie counters transactionally;
+    this class keeps the top entries in memory and reconciles them
+    with the counters periodically, so rendering the leaderboard does
+    not touch the database.
+    """
+
+    def __init__(self, data_manager, size=25, min_ratings=2,
+                 refresh_interval=300, min_refresh_interval=15):
+        """
+        Initialize the leaderboard.
+
+        Args:
+            data_manager (SQLiteDataManager): Source of the counters.
+            size (int): Number of movies kept per list.
+            min_ratings (int): Ratings needed to rank by rating.
+            refresh_interval (int): Seconds between reconciliations.
+            min_refresh_interval (int): Minimum seconds between two
+                reconciliations triggered by invalidate().
+        """
+        super().__init__(refresh_interval, min_refresh_interval)
+        self.data_manager = data_manager
+        self.size = size
+        self.min_ratings = min_ratings
+
+    def build(self):
+        """
+        Read the top movies from the popularity counters.
+
+        Returns:
+            dict: 'owners' and 'rating' lists of movie dicts.
+        """
+        return {
+            order_by: tuple(self.data_manager.get_popular_movies(
+                order_by, self.size, self.min_ratings))
+            for order_by in ('owners', 'rating')
+        }
+
+    def most_collected(self):
+        """
+        Retrieve the movies found in the most collections.
+
+        Returns:
+            tuple: Movie dicts, most collected first.
+        """
+        return self.snapshot()['owners']
+
+    def highest_rated(self):
+        """
+        Retrieve the movies with the highest average rating.
+
+        Returns:
+            tuple: Movie dicts, best rated first.
+        """
+        return self.snapshot()['rating']
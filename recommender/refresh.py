@@ -0,0 +1,89 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+class PeriodicSnapshot(ABC):
+    """
+    Base class for read-only data rebuilt away from the request path.
+
+    Subclasses implement build(). The first snapshot() call builds
+    synchronously; afterwards a rebuild runs in a background thread
+    when the data is older than refresh_interval, or after
+    invalidate() once min_refresh_interval has passed. Readers always
+    get the last complete snapshot.
+    """
+
+    def __init__(self, refresh_interval=600, min_refresh_interval=30):
+        """
+        Initialize the snapshot holder.
+
+        Args:
+            refresh_interval (int): Maximum age in seconds.
+            min_refresh_interval (int): Minimum seconds between two
+                rebuilds triggered by invalidate().
+        """
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._snapshot = None
+        self._built_at = None
+        self._dirty = False
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def build(self):
+        """
+        Compute a new snapshot.
+
+        Returns:
+            object: The data served by snapshot().
+        """
+        pass
+
+    def refresh(self):
+        """
+        Rebuild the snapshot synchronously.
+        """
+        self._dirty = False
+        snapshot = self.build()
+        with self._lock:
+            self._snapshot = snapshot
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        """
+        Mark the snapshot as outdated after the source data changed.
+        """
+        self._dirty = True
+
+    def snapshot(self):
+        """
+        Return the current snapshot, scheduling a rebuild if stale.
+
+        Returns:
+            object: The last value returned by build().
+        """
+        if self._built_at is None:
+            self.refresh()
+            return self._snapshot
+
+        age = time.monotonic() - self._built_at
+        stale = age > self.refresh_interval or (
+            self._dirty and age > self.min_refresh_interval)
+        if stale:
+            with self._lock:
+                start = not self._refreshing
+                self._refreshing = True
+            if start:
+                threading.Thread(target=self._background_refresh,
+                                 daemon=True).start()
+        return self._snapshot
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Error refreshing {type(self).__name__}: {e}")
+        finally:
+            self._refreshing = False
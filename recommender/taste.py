@@ -0,0 +1,169 @@
+import numpy as np
+from scipy import sparse
+from recommender.refresh import PeriodicSnapshot
+
+DEFAULT_WEIGHT = 0.5
+
+
+def top_k_per_row(matrix, k):
+    """
+    Keep the k largest entries of every row of a sparse matrix.
+
+    Works on all rows at once: entries are sorted by (row, -value)
+    and each entry's rank within its row is derived from the offset
+    to the row's first entry.
+
+    Args:
+        matrix (spmatrix): Sparse matrix with non-negative scores.
+        k (int): Number of entries to keep per row.
+
+    Returns:
+        tuple: (rows, cols, values) arrays, ordered by row and then
+        by descending value.
+    """
+    coo = matrix.tocoo()
+    keep = coo.data > 0
+    rows, cols, values = coo.row[keep], coo.col[keep], coo.data[keep]
+    order = np.lexsort((-values, rows))
+    rows, cols, values = rows[order], cols[order], values[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    keep = rank < k
+    return rows[keep], cols[keep], values[keep]
+
+
+def build_taste_index(ratings, neighbors=10, recommendations=10):
+    """
+    Compute similar users and suggested movies for every user.
+
+    Each user is a row of a sparse user x movie matrix weighted by
+    rating / 10 (unrated movies count as DEFAULT_WEIGHT). Users are
+    compared by cosine similarity, and a user's suggestions are the
+    movies owned by their nearest neighbors, scored by similarity
+    and excluding movies the user already has.
+
+    Args:
+        ratings (iterable): (user_id, imdb_id, name, rating) rows.
+        neighbors (int): Similar users kept per user.
+        recommendations (int): Suggested movies kept per user.
+
+    Returns:
+        tuple: Dicts keyed by user ID with lists of
+        (user_id, similarity) and (imdb_id, name, score) tuples.
+    """
+    user_index, movie_index, titles = {}, {}, []
+    user_rows, movie_cols, weights = [], [], []
+    for user_id, imdb_id, name, rating in ratings:
+        user_rows.append(user_index.setdefault(user_id, len(user_index)))
+        if imdb_id not in movie_index:
+            movie_index[imdb_id] = len(movie_index)
+            titles.append(name)
+        movie_cols.append(movie_index[imdb_id])
+        weights.append(rating / 10 if rating else DEFAULT_WEIGHT)
+
+    if not user_index:
+        return {}, {}
+
+    user_ids = np.array(list(user_index), dtype=object)
+    imdb_ids = np.array(list(movie_index), dtype=object)
+    shape = (len(user_index), len(movie_index))
+
+    matrix = sparse.csr_matrix(
+        (np.asarray(weights, dtype=np.float64),
+         (np.asarray(user_rows), np.asarray(movie_cols))), shape=shape)
+    # A movie listed twice by the same user counts once
+    matrix.sum_duplicates()
+    matrix.data = np.minimum(matrix.data, 1.0)
+    owned = matrix.copy()
+    owned.data[:] = 1.0
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)))
+    normalized = sparse.diags(1 / norms.ravel()) @ matrix
+    similarity = (normalized @ normalized.T).tolil()
+    similarity.setdiag(0)
+    similarity = similarity.tocsr()
+
+    rows, cols, values = top_k_per_row(similarity, neighbors)
+    neighbor_index = {}
+    for row, col, value in zip(user_ids[rows], user_ids[cols],
+                               values.tolist()):
+        neighbor_index.setdefault(row, []).append((col, value))
+
+    weights = sparse.csr_matrix((values, (rows, cols)),
+                                shape=(shape[0], shape[0]))
+    scores = weights @ owned
+    scores = (scores - scores.multiply(owned)).tocsr()
+    scores.eliminate_zeros()
+
+    rows, cols, values = top_k_per_row(scores, recommendations)
+    recommendation_index = {}
+    for row, col, value in zip(user_ids[rows], cols.tolist(),
+                               values.tolist()):
+        recommendation_index.setdefault(row, []).append(
+            (imdb_ids[col], titles[col], value))
+
+    return neighbor_index, recommendation_index
+
+
+class TasteIndex(PeriodicSnapshot):
+    """
+    Precomputed "users with similar taste" and movie suggestions.
+
+    Lookups only read the last built index; see PeriodicSnapshot for
+    when it is rebuilt.
+    """
+
+    def __init__(self, data_manager, refresh_interval=600,
+                 min_refresh_interval=30, neighbors=10,
+                 recommendations=10):
+        """
+        Initialize the index.
+
+        Args:
+            data_manager (SQLiteDataManager): Source of ratings.
+            refresh_interval (int): Maximum age of the index in
+                seconds.
+            min_refresh_interval (int): Minimum seconds between two
+                rebuilds triggered by invalidate().
+            neighbors (int): Similar users kept per user.
+            recommendations (int): Suggested movies kept per user.
+        """
+        super().__init__(refresh_interval, min_refresh_interval)
+        self.data_manager = data_manager
+        self.neighbors = neighbors
+        self.recommendations = recommendations
+
+    def build(self):
+        """
+        Compute the neighbor and suggestion indexes.
+
+        Returns:
+            tuple: Neighbor index and suggestion index.
+        """
+        return build_taste_index(self.data_manager.iter_ratings(),
+                                 self.neighbors, self.recommendations)
+
+    def similar_users(self, user_id):
+        """
+        Retrieve the users whose collections are most alike.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            list: (user_id, similarity) tuples, most similar first.
+        """
+        neighbors, _ = self.snapshot() or ({}, {})
+        return neighbors.get(user_id, [])
+
+    def recommend(self, user_id):
+        """
+        Retrieve suggested movies for a user.
+
+        Args:
+            user_id (int): ID of the user.
+
+        Returns:
+            list: (imdb_id, name, score) tuples, best first.
+        """
+        _, recommendations = self.snapshot() or ({}, {})
+        return recommendations.get(user_id, [])
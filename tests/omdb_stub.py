@@ -0,0 +1,138 @@
+"""
+Local stand-in for the OMDb API with injected latency.
+
+Used by the tests, and runnable on its own for load testing:
+
+    python tests/omdb_stub.py --port 8001 --latency 0.5
+    OMDB_URL=http://127.0.0.1:8001/ flask --app app run
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Title searches find this many results, ten per page
+SEARCH_TOTAL = 25
+
+
+def stub_search_page(title, page):
+    """
+    Build one page of OMDb title search results.
+
+    The exact title is the last result, and every page after the first
+    repeats the previous page's last result, as OMDb sometimes does.
+    """
+    start = (page - 1) * 10
+    numbers = range(max(start - 1, 0), min(start + 10, SEARCH_TOTAL))
+    return [{"Title": title.title() if n == SEARCH_TOTAL - 1
+             else f"{title.title()} Returns {n}",
+             "Year": str(1950 + n), "imdbID": f"tt{9000 + n}",
+             "Type": "movie"} for n in numbers]
+
+
+def stub_movie(imdb_id):
+    """
+    Build OMDb details for any IMDb ID.
+    """
+    number = int(imdb_id[2:])
+    return {"Response": "True", "Title": f"Stub Movie {number}",
+            "Year": str(1950 + number % 70), "Director": "Stub Director",
+            "imdbRating": "7.0", "Plot": f"Plot of {imdb_id}.",
+            "imdbID": imdb_id}
+
+
+class OMDbStub:
+    """
+    OMDb-compatible HTTP server answering after a fixed delay.
+
+    IDs of the form 'tt<digits>' are found, as are title searches
+    (SEARCH_TOTAL results in pages of ten), except those containing
+    'missing'.
+    """
+
+    def __init__(self, latency=0.0, port=0):
+        """
+        Initialize the server.
+
+        Args:
+            latency (float): Seconds to wait before each response.
+            port (int): Port to listen on; 0 picks a free one.
+        """
+        self.latency = latency
+        self.requests = 0
+        # Largest number of requests answered at the same time, to
+        # check that clients overlap their requests
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    stub._in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight,
+                                             stub._in_flight)
+                try:
+                    time.sleep(stub.latency)
+                finally:
+                    with stub._lock:
+                        stub._in_flight -= 1
+                params = parse_qs(urlparse(self.path).query)
+                body = json.dumps(stub.respond(params)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        """
+        str: Base URL to use as OMDB_URL.
+        """
+        return f"http://127.0.0.1:{self.server.server_port}/"
+
+    def respond(self, params):
+        """
+        Build the JSON answer for a request's query parameters.
+        """
+        imdb_id = params.get("i", [""])[0]
+        title = params.get("s", [""])[0]
+        if imdb_id[:2] == "tt" and imdb_id[2:].isdigit():
+            return stub_movie(imdb_id)
+        if title and "missing" not in title.lower():
+            page = int(params.get("page", ["1"])[0])
+            return {"Response": "True",
+                    "Search": stub_search_page(title, page),
+                    "totalResults": str(SEARCH_TOTAL)}
+        return {"Response": "False", "Error": "Movie not found!"}
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.5)
+    args = parser.parse_args()
+    with OMDbStub(args.latency, args.port) as stub:
+        print(f"OMDb stand-in on {stub.url} "
+              f"with {args.latency}s latency")
+        threading.Event().wait()
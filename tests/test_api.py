@@ -1,6 +1,28 @@
+import asyncio
+import functools
+import time
+import httpx
+import pytest
 import requests
 from unittest.mock import patch
-from api import make_api_request
+from api import make_api_request, circuit_breaker, negative_cache, \
+    CircuitBreaker, fetch_movies_by_id_async, make_api_request_async, \
+    search_movies_async, search_cache
+from tests.omdb_stub import OMDbStub, stub_movie
+
+
+@pytest.fixture(autouse=True)
+def reset_api_state():
+    """
+    Starts every test with a closed circuit and no cached failures.
+    """
+    circuit_breaker.reset()
+    negative_cache.clear()
+    search_cache.clear()
+    yield
+    circuit_breaker.reset()
+    negative_cache.clear()
+    search_cache.clear()
 
 
 def mock_requests_get_success(*args, **kwargs):
@@ -100,3 +122,136 @@ def test_make_api_request_exception(mock_get):
 
     response = make_api_request("tt0068646", by_id=True)
     assert response is None
+
+
+@patch('requests.get', side_effect=mock_requests_get_failure)
+def test_not_found_is_cached(mock_get):
+    """
+    Tests that a lookup that found nothing is not repeated.
+    """
+    assert make_api_request("Nonexistent Movie") is None
+    assert make_api_request("nonexistent movie ") is None
+    assert mock_get.call_count == 1
+
+
+@patch('requests.get',
+       side_effect=requests.exceptions.Timeout("timed out"))
+def test_circuit_opens_after_repeated_failures(mock_get):
+    """
+    Tests that requests stop once OMDb keeps failing.
+    """
+    for n in range(circuit_breaker.failure_threshold):
+        make_api_request(f"Movie {n}")
+    assert circuit_breaker.state == CircuitBreaker.OPEN
+
+    assert make_api_request("Another Movie") is None
+    assert mock_get.call_count == circuit_breaker.failure_threshold
+
+
+def html_response(*args, **kwargs):
+    """
+    Mocks a proxy error page answered with status 200.
+    """
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b"<html>Bad gateway</html>"
+    return response
+
+
+@patch('requests.get', side_effect=html_response)
+def test_circuit_opens_on_unreadable_answers(mock_get, monkeypatch):
+    """
+    Tests that 200 answers without JSON count as failures on both the
+    sync and the async path.
+    """
+    for n in range(circuit_breaker.failure_threshold):
+        assert make_api_request(f"Movie {n}") is None
+    assert circuit_breaker.state == CircuitBreaker.OPEN
+
+    circuit_breaker.reset()
+    monkeypatch.setattr(httpx, 'AsyncClient', functools.partial(
+        httpx.AsyncClient, transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, text="<html></html>"))))
+    for n in range(circuit_breaker.failure_threshold):
+        assert asyncio.run(make_api_request_async(f"Other {n}")) is None
+    assert circuit_breaker.state == CircuitBreaker.OPEN
+
+
+def test_circuit_recovers_in_background():
+    """
+    Tests that a successful background probe closes the circuit.
+    """
+    probes = []
+    breaker = CircuitBreaker(lambda: probes.append(1) or len(probes) > 1,
+                             failure_threshold=2, recovery_timeout=0.01)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    deadline = time.monotonic() + 2
+    while not breaker.allow() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert breaker.allow()
+    assert len(probes) == 2
+
+
+def test_async_requests_overlap(monkeypatch):
+    """
+    Tests that async lookups against a slow OMDb run concurrently.
+    """
+    with OMDbStub(latency=0.3) as stub:
+        monkeypatch.setenv('OMDB_URL', stub.url)
+        imdb_ids = [f"tt{n}" for n in range(1, 11)]
+
+        movies = asyncio.run(fetch_movies_by_id_async(imdb_ids))
+
+        assert sorted(movies) == sorted(imdb_ids)
+        assert movies["tt7"]["Plot"] == "Plot of tt7."
+        # Sequential requests would never overlap
+        assert stub.max_in_flight > 1
+
+        assert asyncio.run(make_api_request_async("missing")) is None
+        assert asyncio.run(make_api_request_async("missing")) is None
+        assert stub.requests == 11
+
+
+def test_async_invalid_json_is_a_failure(monkeypatch):
+    """
+    Tests that a 200 answer with a non-JSON body fails only its own
+    lookup instead of the whole batch.
+    """
+    def answer(request):
+        imdb_id = request.url.params["i"]
+        if imdb_id == "tt2":
+            return httpx.Response(200, text="<html>Bad gateway</html>")
+        return httpx.Response(200, json=stub_movie(imdb_id))
+
+    monkeypatch.setattr(httpx, 'AsyncClient', functools.partial(
+        httpx.AsyncClient, transport=httpx.MockTransport(answer)))
+
+    movies = asyncio.run(fetch_movies_by_id_async(["tt1", "tt2", "tt3"]))
+    assert sorted(movies) == ["tt1", "tt3"]
+    assert asyncio.run(make_api_request_async("tt2", by_id=True)) is None
+
+
+def test_search_merges_pages_concurrently(monkeypatch):
+    """
+    Tests that a search reads several pages at once, merges and ranks
+    them, and serves repeats from the cache.
+    """
+    with OMDbStub(latency=0.3) as stub:
+        monkeypatch.setenv('OMDB_URL', stub.url)
+
+        results = asyncio.run(search_movies_async("heat", max_pages=3))
+
+        ids = [result["imdbID"] for result in results]
+        assert len(ids) == len(set(ids)) == 25
+        # The exact title was on the last page
+        assert results[0]["Title"] == "Heat"
+        assert stub.requests == 3
+        # First page, then the other two together
+        assert stub.max_in_flight == 2
+
+        assert asyncio.run(search_movies_async(" HEAT ")) == results
+        assert stub.requests == 3
@@ -1,7 +1,16 @@
+import gzip
+import io
+import os
+import runpy
 import pytest
-from app import app, data_manager
+from unittest.mock import patch, AsyncMock
+from app import app, create_app, data_manager, catalog, taste_index, \
+    leaderboard
 from flask import url_for
 from bs4 import BeautifulSoup
+from web import build_assets
+from api import circuit_breaker, negative_cache, search_cache
+from tests.omdb_stub import OMDbStub
 from datamanager.sqlite_data_manager import Base, User, Movie
 
 
@@ -19,10 +28,12 @@ def setup_database():
     """
     Sets up the database for testing and tears it down after.
     """
-    Base.metadata.drop_all(bind=data_manager.engine)
-    Base.metadata.create_all(bind=data_manager.engine)
-    yield
-    Base.metadata.drop_all(bind=data_manager.engine)
+    with app.app_context():
+        Base.metadata.drop_all(bind=data_manager.engine)
+        Base.metadata.create_all(bind=data_manager.engine)
+        data_manager.clear_cache()
+        yield
+        Base.metadata.drop_all(bind=data_manager.engine)
 
 
 def extract_flash_message(response):
@@ -141,13 +152,13 @@ def test_add_movie(client):
     session.close()
 
     response = client.get(
-        url_for('add_movie_form',
+        url_for('main.add_movie_form',
                 user_id=user_id) + '?title=The Godfather'
     )
     assert response.status_code == 200
 
     response = client.post(
-        url_for('confirm_add_movie', user_id=user_id),
+        url_for('main.confirm_add_movie', user_id=user_id),
         data={'imdb_ids': ['tt0068646']},
         follow_redirects=True
     )
@@ -169,7 +180,7 @@ def test_update_movie(client):
     session.close()
 
     client.post(
-        url_for('confirm_add_movie', user_id=user_id),
+        url_for('main.confirm_add_movie', user_id=user_id),
         data={'imdb_ids': ['tt0068646']},
         follow_redirects=True
     )
@@ -209,7 +220,7 @@ def test_delete_movie(client):
     session.close()
 
     client.post(
-        url_for('confirm_add_movie', user_id=user_id),
+        url_for('main.confirm_add_movie', user_id=user_id),
         data={'imdb_ids': ['tt0068646']},
         follow_redirects=True
     )
@@ -238,3 +249,426 @@ def test_get_movie_plot(client):
     response = client.get('/get_movie_plot/tt0068646')
     assert response.status_code == 200
     assert b"plot" in response.data
+
+
+def test_export_movies(client):
+    """
+    Tests streaming a user's collection as CSV and NDJSON.
+    """
+    client.post('/add_user', data={'name': 'John Doe'})
+    session = data_manager.Session()
+    user = session.query(User).filter_by(name='John Doe').first()
+    user_id = user.id
+    session.close()
+
+    data_manager.add_movies(user_id, [
+        {'title': 'The Godfather', 'director': 'Francis Ford Coppola',
+         'year': 1972, 'rating': 9.2, 'imdb_id': 'tt0068646'},
+        {'title': 'Heat', 'director': 'Michael Mann',
+         'year': 1995, 'rating': 8.3, 'imdb_id': 'tt0113277'},
+    ])
+
+    response = client.get(f'/users/{user_id}/export?format=csv')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == "title,director,year,rating,imdb_id"
+    assert "Heat,Michael Mann,1995,8.3,tt0113277" in lines
+
+    response = client.get(f'/users/{user_id}/export?format=ndjson')
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).splitlines()
+    assert len(lines) == 2
+    assert '"imdb_id": "tt0068646"' in lines[0]
+
+    response = client.get(f'/users/{user_id}/export?format=xml',
+                          follow_redirects=True)
+    assert ("Unsupported export format 'xml'." in
+            extract_flash_message(response))
+
+
+def test_import_movies_rejects_unreadable_files(client):
+    """
+    Tests that unparseable uploads are reported instead of failing.
+    """
+    client.post('/add_user', data={'name': 'John Doe'})
+    user_id = data_manager.get_user_by_name('John Doe').id
+
+    uploads = {
+        'movies.csv': b"Title,Year\n" + b"a" * (1 << 21) + b",1995\n",
+        'movies.json': b'[{"title": "Heat"}, {"title": Heat}]',
+    }
+    for filename, content in uploads.items():
+        response = client.post(
+            f'/users/{user_id}/import',
+            data={'collection': (io.BytesIO(content), filename)},
+            content_type='multipart/form-data', follow_redirects=True)
+        assert response.status_code == 200
+        assert any(message.startswith(f"Could not read '{filename}'")
+                   for message in extract_flash_message(response))
+
+
+def test_import_movies_limits_entries(client, monkeypatch):
+    """
+    Tests that uploads too large to import within a request are
+    rejected before any lookup, pointing at the CLI.
+    """
+    client.post('/add_user', data={'name': 'John Doe'})
+    user_id = data_manager.get_user_by_name('John Doe').id
+    monkeypatch.setitem(app.config, 'IMPORT_MAX_ENTRIES', 2)
+    content = b"Const,Title,Year\n" + b"".join(
+        b"tt%07d,Movie %d,1990\n" % (n, n) for n in range(3))
+
+    with patch('importer.collection.fetch_movies_by_id') as fetch:
+        response = client.post(
+            f'/users/{user_id}/import',
+            data={'collection': (io.BytesIO(content), 'movies.csv')},
+            content_type='multipart/form-data', follow_redirects=True)
+    assert ("'movies.csv' has more than 2 movies. Import it with the "
+            "'flask import-collection' command instead."
+            in extract_flash_message(response))
+    fetch.assert_not_called()
+    assert data_manager.get_user_movies(user_id) == ()
+
+
+def test_user_stats(client):
+    """
+    Tests incremental statistics on add, update and delete.
+    """
+    client.post('/add_user', data={'name': 'John Doe'})
+    session = data_manager.Session()
+    user = session.query(User).filter_by(name='John Doe').first()
+    user_id = user.id
+    session.close()
+
+    data_manager.add_movies(user_id, [
+        {'title': 'The Godfather', 'director': 'Francis Ford Coppola',
+         'year': 1972, 'rating': 9.0, 'imdb_id': 'tt0068646'},
+        {'title': 'Heat', 'director': 'Michael Mann',
+         'year': 1995, 'rating': None, 'imdb_id': 'tt0113277'},
+    ])
+    data_manager.add_movie(user_id, 'The Conversation',
+                           'Francis Ford Coppola', 1974, 7.0,
+                           'tt0071360')
+
+    stats = data_manager.get_user_stats(user_id)
+    assert stats['movie_count'] == 3
+    assert stats['average_rating'] == 8.0
+    assert list(stats['decades']) == [(1970, 2), (1990, 1)]
+    assert stats['top_directors'][0] == ('Francis Ford Coppola', 2)
+
+    session = data_manager.Session()
+    heat = session.query(Movie).filter_by(imdb_id='tt0113277').first()
+    godfather = session.query(Movie).filter_by(
+        imdb_id='tt0068646').first()
+    heat_id, godfather_id = heat.id, godfather.id
+    session.close()
+    data_manager.update_movie(heat_id, rating=10.0)
+    data_manager.delete_movie(godfather_id)
+
+    stats = data_manager.get_user_stats(user_id)
+    assert stats['movie_count'] == 2
+    assert stats['average_rating'] == 8.5
+    assert list(stats['top_directors']) == [('Francis Ford Coppola', 1),
+                                            ('Michael Mann', 1)]
+
+    data_manager.rebuild_stats()
+    assert data_manager.get_user_stats(user_id) == stats
+
+    response = client.get(f'/users/{user_id}/stats')
+    assert response.status_code == 200
+    assert b"Collection Statistics of John Doe" in response.data
+
+
+def test_recommendations(client):
+    """
+    Tests the recommendations page for users with shared movies.
+    """
+    for name in ('John Doe', 'Jane Doe'):
+        client.post('/add_user', data={'name': name})
+    session = data_manager.Session()
+    john, jane = (session.query(User).filter_by(name=name).first().id
+                  for name in ('John Doe', 'Jane Doe'))
+    session.close()
+
+    godfather = {'title': 'The Godfather', 'director': 'Francis Ford '
+                 'Coppola', 'year': 1972, 'rating': 9.2,
+                 'imdb_id': 'tt0068646'}
+    data_manager.add_movies(john, [godfather])
+    data_manager.add_movies(jane, [godfather, {
+        'title': 'Heat', 'director': 'Michael Mann', 'year': 1995,
+        'rating': 8.3, 'imdb_id': 'tt0113277'}])
+    taste_index.refresh()
+
+    # Only the neighbours are looked up, not the whole user table
+    with patch.object(data_manager._get_current_object(), 'get_all_users',
+                      side_effect=AssertionError):
+        response = client.get(f'/users/{john}/recommendations')
+    assert response.status_code == 200
+    assert b"Jane Doe" in response.data
+    assert b"tt0113277" in response.data
+
+
+def test_popular_movies(client):
+    """
+    Tests popularity counters across collections and the leaderboard.
+    """
+    for name in ('John Doe', 'Jane Doe'):
+        client.post('/add_user', data={'name': name})
+    session = data_manager.Session()
+    john, jane = (session.query(User).filter_by(name=name).first().id
+                  for name in ('John Doe', 'Jane Doe'))
+    session.close()
+
+    godfather = {'title': 'The Godfather', 'director': 'Francis Ford '
+                 'Coppola', 'year': 1972, 'rating': 9.0,
+                 'imdb_id': 'tt0068646'}
+    heat = {'title': 'Heat', 'director': 'Michael Mann', 'year': 1995,
+            'rating': 8.0, 'imdb_id': 'tt0113277'}
+    data_manager.add_movies(john, [godfather, heat])
+    data_manager.add_movies(jane, [dict(godfather, rating=8.0)])
+
+    top = data_manager.get_popular_movies('owners')
+    assert [(m['imdb_id'], m['owner_count']) for m in top] == [
+        ('tt0068646', 2), ('tt0113277', 1)]
+    assert top[0]['average_rating'] == 8.5
+
+    session = data_manager.Session()
+    movie = session.query(Movie).filter_by(user_id=john,
+                                           imdb_id='tt0068646').first()
+    movie_id = movie.id
+    session.close()
+    data_manager.delete_movie(movie_id)
+
+    top = data_manager.get_popular_movies('rating', min_ratings=1)
+    assert [(m['imdb_id'], m['average_rating']) for m in top] == [
+        ('tt0068646', 8.0), ('tt0113277', 8.0)]
+
+    leaderboard.refresh()
+    response = client.get('/popular')
+    assert response.status_code == 200
+    assert b"The Godfather" in response.data
+
+
+def test_create_app_opens_database_lazily(tmp_path):
+    """
+    Tests that the factory defers opening the database until first
+    use and survives a simulated fork.
+    """
+    database = tmp_path / "factory.db"
+    factory_app = create_app({'DATABASE': str(database),
+                              'TESTING': True})
+    assert not database.exists()
+
+    with factory_app.test_client() as factory_client:
+        assert factory_client.get('/users').status_code == 200
+        assert database.exists()
+
+        factory_app.extensions['moviweb'].after_fork()
+        factory_client.post('/add_user', data={'name': 'Jane Doe'})
+        assert b"Jane Doe" in factory_client.get('/users').data
+
+
+def test_workers_share_fresh_reads(tmp_path, monkeypatch):
+    """
+    Tests that with several gunicorn workers a write made by one
+    worker is visible to the next request served by another.
+    """
+    monkeypatch.setenv('READ_CACHE_SIZE', '64')
+    monkeypatch.setenv('DATA_MANAGER', 'sqlite')
+    monkeypatch.setenv('WEB_CONCURRENCY', '1')
+    runpy.run_path('gunicorn.conf.py')
+    assert os.environ['READ_CACHE_SIZE'] == '64'
+
+    monkeypatch.setenv('WEB_CONCURRENCY', '3')
+    runpy.run_path('gunicorn.conf.py')
+    assert os.environ['READ_CACHE_SIZE'] == '0'
+
+    database = str(tmp_path / "workers.db")
+    first, second = (create_app({'DATABASE': database, 'TESTING': True})
+                     for _ in range(2))
+    writer, reader = first.test_client(), second.test_client()
+    assert b"Jane Doe" not in reader.get('/users').data
+    writer.post('/add_user', data={'name': 'Jane Doe'})
+    assert b"Jane Doe" in reader.get('/users').data
+
+
+def test_compressed_responses(client):
+    """
+    Tests that large pages are gzipped only when the client accepts it.
+    """
+    plain = client.get('/users')
+    assert 'Content-Encoding' not in plain.headers
+
+    response = client.get('/users', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == plain.data
+
+
+def test_fingerprinted_static_assets(tmp_path):
+    """
+    Tests building hashed assets and serving them immutable and
+    pre-compressed.
+    """
+    static = tmp_path / "static"
+    static.mkdir()
+    (static / "styles.css").write_text("body { color: red; }" * 50)
+    manifest = build_assets(str(static))
+    hashed = manifest['styles.css']
+    assert hashed.startswith('dist/styles.') and hashed.endswith('.css')
+    assert (static / (hashed + '.gz')).exists()
+
+    factory_app = create_app({'DATABASE': str(tmp_path / "assets.db")})
+    factory_app.static_folder = str(static)
+    with factory_app.test_request_context():
+        assert url_for('static', filename='styles.css') == \
+            f"/static/{hashed}"
+
+    with factory_app.test_client() as factory_client:
+        response = factory_client.get(
+            f"/static/{hashed}", headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'immutable' in response.headers['Cache-Control']
+        assert gzip.decompress(response.data) == \
+            (static / "styles.css").read_bytes()
+        response.close()
+
+        response = factory_client.get('/static/styles.css')
+        assert 'immutable' not in response.headers.get(
+            'Cache-Control', '')
+        response.close()
+
+
+def test_get_movie_plots(client):
+    """
+    Tests resolving many plots at once, storing the fetched ones.
+    """
+    data_manager.save_plots({'tt0068646': "A mafia family saga."})
+    fetched = {'tt0113277': {'Response': 'True', 'Plot': "A heist."},
+               'tt0369339': {'Response': 'True', 'Plot': "N/A"}}
+
+    with patch('app.fetch_movies_by_id_async', new=AsyncMock(
+            return_value=fetched)) as fetch:
+        response = client.get(
+            '/plots?ids=tt0068646,tt0113277,tt0369339,bogus')
+        assert response.get_json() == {'plots': {
+            'tt0068646': "A mafia family saga.",
+            'tt0113277': "A heist.",
+            'tt0369339': None}}
+        fetch.assert_called_once_with(['tt0113277', 'tt0369339'])
+
+        # Movies without a plot are remembered too
+        response = client.get('/plots?ids=tt0113277,tt0369339')
+        assert response.get_json()['plots']['tt0369339'] is None
+        assert fetch.call_count == 1
+
+    too_many = ','.join(f"tt{n}" for n in range(51))
+    assert client.get(f'/plots?ids={too_many}').status_code == 400
+
+
+def test_add_movie_form_renders_plot_script(client):
+    """
+    Tests that the pages rendered by the add movie search emit the
+    plot batching script with its batch size.
+    """
+    client.post('/add_user', data={'name': 'John Doe'})
+    user_id = data_manager.get_user_by_name('John Doe').id
+
+    with patch('app.search_movies_async', new=AsyncMock(return_value=[])):
+        for query in ('', '?title=', '?title=unknown'):
+            response = client.get(f'/users/{user_id}/add_movie{query}')
+            assert response.status_code == 200
+            script = response.get_data(as_text=True)
+            assert "i += 50)" in script
+            assert "i + 50)" in script
+
+
+def test_confirm_add_movie_from_catalog(client, tmp_path):
+    """
+    Tests adding a movie found in the local catalog while OMDb is
+    unavailable.
+    """
+    client.post('/add_user', data={'name': 'John Doe'})
+    user_id = data_manager.get_user_by_name('John Doe').id
+    dump = tmp_path / "title.basics.tsv"
+    dump.write_text(
+        "tconst\ttitleType\tprimaryTitle\toriginalTitle\tstartYear\n"
+        "tt0113277\tmovie\tHeat\tHeat\t1995\n", encoding="utf-8")
+    catalog.import_title_basics(str(dump))
+
+    with patch('app.fetch_movies_by_id_async',
+               new=AsyncMock(return_value={})):
+        response = client.post(
+            f'/users/{user_id}/confirm_add_movie',
+            data={'imdb_ids': ['tt0113277']}, follow_redirects=True)
+
+    assert ("Movies 'Heat' added successfully." in
+            extract_flash_message(response))
+    movie = data_manager.get_user_movies(user_id)[0]
+    assert (movie.year, movie.director, movie.rating) == \
+        (1995, 'Unknown', None)
+    # The plot is still looked up once OMDb is back
+    assert data_manager.get_plots(['tt0113277']) == {}
+
+
+def test_confirm_add_movie_fetches_concurrently(client, monkeypatch):
+    """
+    Tests that adding several movies against a slow OMDb sends the
+    lookups concurrently, not one per round trip.
+    """
+    client.post('/add_user', data={'name': 'John Doe'})
+    user_id = data_manager.get_user_by_name('John Doe').id
+
+    circuit_breaker.reset()
+    negative_cache.clear()
+    with OMDbStub(latency=0.3) as stub:
+        monkeypatch.setenv('OMDB_URL', stub.url)
+        monkeypatch.setenv('API_KEY', 'stub')
+        client.post(f'/users/{user_id}/confirm_add_movie',
+                    data={'imdb_ids': [f"tt{n}" for n in range(1, 6)]})
+
+    assert len(data_manager.get_user_movies(user_id)) == 5
+    assert data_manager.get_plots(['tt3']) == {'tt3': "Plot of tt3."}
+    # The lookups overlapped instead of running one after another
+    assert stub.max_in_flight > 1
+
+
+def test_add_movie_form_pages_merged_results(client, monkeypatch):
+    """
+    Tests paging through a multi-page search without new requests.
+    """
+    client.post('/add_user', data={'name': 'John Doe'})
+    user_id = data_manager.get_user_by_name('John Doe').id
+    circuit_breaker.reset()
+    negative_cache.clear()
+    search_cache.clear()
+
+    with OMDbStub() as stub:
+        monkeypatch.setenv('OMDB_URL', stub.url)
+        monkeypatch.setenv('API_KEY', 'stub')
+        first = client.get(f'/users/{user_id}/add_movie?title=heat')
+        third = client.get(
+            f'/users/{user_id}/add_movie?title=heat&page=3')
+
+    first_titles = BeautifulSoup(first.data, 'html.parser').find_all(
+        'strong')
+    assert first_titles[0].text == "Heat"
+    assert len(first_titles) == 10
+    assert b"tt9022" in third.data and b"Next" in third.data
+    assert stub.requests == 3
+
+
+def test_sharded_app(tmp_path):
+    """
+    Tests running the app on the sharded data manager.
+    """
+    sharded_app = create_app({'DATA_MANAGER': 'sharded', 'SHARD_COUNT': 2,
+                              'DATABASE': str(tmp_path / "moviweb.db")})
+    with sharded_app.test_client() as sharded_client:
+        for name in ('Ann', 'Bob'):
+            sharded_client.post('/add_user', data={'name': name})
+        assert b"Bob" in sharded_client.get('/users').data
+        assert (tmp_path / "moviweb.shard1.db").exists()
+        sharded_app.extensions['moviweb'].after_fork()
+        assert sharded_client.get('/popular').status_code == 200
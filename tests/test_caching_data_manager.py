@@ -0,0 +1,91 @@
+import pytest
+from datamanager import CachingDataManager, InMemoryDataManager
+
+MOVIES = [
+    {'title': 'heat', 'director': 'Michael Mann', 'year': 1995,
+     'rating': 8.3, 'imdb_id': 'tt0113277'},
+    {'title': 'the godfather', 'director': 'Francis Ford Coppola',
+     'year': 1972, 'rating': 9.2, 'imdb_id': 'tt0068646'},
+]
+
+
+@pytest.fixture
+def data_manager():
+    """
+    Provides a cache around an in-memory data manager with two users.
+    """
+    manager = CachingDataManager(InMemoryDataManager(), maxsize=8)
+    manager.add_user("John Doe")
+    manager.add_user("Jane Doe")
+    for user in manager.get_all_users():
+        manager.add_movies(user.id, MOVIES)
+    return manager
+
+
+def test_hits_and_immutable_results(data_manager):
+    """
+    Tests that repeated reads are served from the cache as immutable
+    values.
+    """
+    user = data_manager.get_user_by_name("John Doe")
+    first = data_manager.find_user_movies(user.id)
+    assert data_manager.find_user_movies(user.id) is first
+    assert data_manager.cache_info().hits >= 1
+
+    stats = data_manager.get_user_stats(user.id)
+    with pytest.raises(TypeError):
+        stats['movie_count'] = 0
+    with pytest.raises(AttributeError):
+        first[0].name = "Changed"
+
+
+def test_writes_invalidate_only_affected_user(data_manager):
+    """
+    Tests that a write drops the owner's reads and keeps other users'.
+    """
+    john = data_manager.get_user_by_name("John Doe")
+    jane = data_manager.get_user_by_name("Jane Doe")
+    johns = data_manager.find_user_movies(john.id)
+    janes = data_manager.find_user_movies(jane.id)
+
+    data_manager.update_movie(johns[0].id, rating=1.0)
+
+    assert data_manager.find_user_movies(jane.id) is janes
+    assert data_manager.find_user_movies(
+        john.id, sort='rating_asc')[0].rating == 1.0
+    assert data_manager.get_user_stats(john.id)['movie_count'] == 2
+
+    data_manager.delete_movie(johns[0].id)
+    assert len(data_manager.get_user_movies(john.id)) == 1
+    assert data_manager.get_popular_movies()[0]['owner_count'] == 2
+
+
+def test_lru_eviction(data_manager):
+    """
+    Tests that the least recently used reads are evicted first.
+    """
+    data_manager.clear_cache()
+    user = data_manager.get_user_by_name("John Doe")
+    for offset in range(10):
+        data_manager.find_user_movies(user.id, offset=offset)
+    info = data_manager.cache_info()
+    assert info.currsize == info.maxsize == 8
+    assert info.evictions == 3
+
+
+def test_write_to_unread_movie_keeps_other_users(data_manager):
+    """
+    Tests that editing a movie that was never read through the cache
+    invalidates its owner only, not every collection.
+    """
+    john = data_manager.get_user_by_name("John Doe")
+    jane = data_manager.get_user_by_name("Jane Doe")
+    janes = data_manager.find_user_movies(jane.id)
+    stats = data_manager.get_user_stats(john.id)
+    movie_id = data_manager.data_manager.get_user_movies(john.id)[0].id
+
+    data_manager.delete_movie(movie_id)
+
+    assert data_manager.find_user_movies(jane.id) is janes
+    assert data_manager.get_user_stats(john.id)['movie_count'] == \
+        stats['movie_count'] - 1
@@ -0,0 +1,102 @@
+import gzip
+import pytest
+from sqlalchemy import create_engine
+from datamanager import Catalog
+from datamanager.catalog import iter_title_basics
+
+HEADER = ("tconst\ttitleType\tprimaryTitle\toriginalTitle\tisAdult\t"
+          "startYear\tendYear\truntimeMinutes\tgenres\n")
+ROWS = [
+    "tt0068646\tmovie\tThe Godfather\tThe Godfather\t0\t1972\t\\N\t175"
+    "\tCrime,Drama\n",
+    "tt0071562\tmovie\tThe Godfather Part II\tThe Godfather Part II\t0"
+    "\t1974\t\\N\t202\tCrime,Drama\n",
+    "tt0903747\ttvSeries\tBreaking Bad\tBreaking Bad\t0\t2008\t2013\t49"
+    "\tCrime,Drama,Thriller\n",
+    "tt0111161\tmovie\tThe Shawshank Redemption\tThe Shawshank "
+    "Redemption\t0\t1994\t\\N\t142\tDrama\n",
+]
+
+
+@pytest.fixture
+def dump(tmp_path):
+    """
+    Writes a small gzip-compressed title.basics dump.
+    """
+    path = tmp_path / "title.basics.tsv.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(HEADER)
+        f.writelines(ROWS)
+    return str(path)
+
+
+@pytest.fixture
+def catalog():
+    """
+    Provides a catalog backed by an in-memory SQLite database.
+    """
+    return Catalog(create_engine("sqlite://"))
+
+
+def test_iter_title_basics_filters_types(dump):
+    """
+    Tests streaming a gzip dump and skipping non-movie titles.
+    """
+    rows = list(iter_title_basics(dump))
+    assert [row['imdb_id'] for row in rows] == [
+        "tt0068646", "tt0071562", "tt0111161"]
+    assert rows[0]['start_year'] == 1972
+    assert rows[0]['genres'] == "Crime,Drama"
+
+
+def test_import_and_search(dump, catalog):
+    """
+    Tests chunked import and prefix search of the catalog.
+    """
+    progress = []
+    result = catalog.import_title_basics(dump, chunk_size=2,
+                                         progress=progress.append)
+    assert result == (3, 0)
+    assert progress == [2, 3]
+
+    results = catalog.search("godfat")
+    assert {r['imdbID'] for r in results} == {"tt0068646", "tt0071562"}
+    assert results[0]['Year'] in ("1972", "1974")
+
+    assert catalog.search("breaking bad") == []
+
+    details = catalog.lookup(["tt0068646", "tt0000001"])
+    assert list(details) == ["tt0068646"]
+    assert details["tt0068646"]["Year"] == "1972"
+
+    # Re-importing the same dump replaces rows instead of failing
+    assert catalog.import_title_basics(dump).imported == 3
+    assert len(catalog.search("shawshank")) == 1
+
+
+def test_import_keeps_index_and_counts_skipped(tmp_path, dump, catalog):
+    """
+    Tests that searches keep working while a re-import runs and that
+    malformed rows are reported as skipped.
+    """
+    catalog.import_title_basics(dump)
+    during = []
+    catalog.import_title_basics(
+        dump, chunk_size=1,
+        progress=lambda n: during.append(len(catalog.search("godfather"))))
+    assert during and all(count == 2 for count in during)
+
+    path = tmp_path / "broken.tsv"
+    path.write_text(HEADER + ROWS[0] + "tt0000001\tmovie\ttoo few\n"
+                    + ROWS[3], encoding="utf-8")
+    result = catalog.import_title_basics(str(path))
+    assert result.imported == 2
+    assert result.skipped == 1
+
+
+def test_search_without_import(catalog, capsys):
+    """
+    Tests searching before any dump was imported.
+    """
+    assert catalog.search("godfather") == []
+    assert "Error" not in capsys.readouterr().out
@@ -0,0 +1,214 @@
+import sqlite3
+import pytest
+from sqlalchemy import inspect
+from datamanager import SQLiteDataManager, InMemoryDataManager, \
+    ShardedDataManager, UserRecord, MovieRecord
+
+MOVIES = [
+    {'title': 'heat', 'director': 'Michael Mann', 'year': 1995,
+     'rating': 8.3, 'imdb_id': 'tt0113277'},
+    {'title': 'the godfather', 'director': 'Francis Ford Coppola',
+     'year': 1972, 'rating': 9.2, 'imdb_id': 'tt0068646'},
+    {'title': 'collateral', 'director': 'Michael Mann',
+     'year': 2004, 'rating': None, 'imdb_id': 'tt0369339'},
+    {'title': 'apocalypse now', 'director': 'Francis Ford Coppola',
+     'year': 1979, 'rating': 8.3, 'imdb_id': 'tt0078788'},
+]
+
+
+@pytest.fixture(params=['sqlite', 'memory', 'sharded'])
+def data_manager(request, tmp_path):
+    """
+    Provides each DataManagerInterface implementation with one user.
+    """
+    if request.param == 'sqlite':
+        manager = SQLiteDataManager(tmp_path / "test.db")
+    elif request.param == 'sharded':
+        manager = ShardedDataManager(tmp_path / "test.db", shard_count=3)
+    else:
+        manager = InMemoryDataManager()
+    manager.add_user("John Doe")
+    manager.add_movies(manager.get_user_by_name("john doe").id, MOVIES)
+    return manager
+
+
+def user_id(data_manager):
+    return data_manager.get_user_by_name("John Doe").id
+
+
+def names(movies):
+    return [movie.name for movie in movies]
+
+
+def test_users(data_manager):
+    """
+    Tests looking up, adding and deleting users.
+    """
+    assert data_manager.get_user_by_name("JOHN DOE").name == "John Doe"
+    assert data_manager.get_user(user_id(data_manager)).name == \
+        "John Doe"
+    assert data_manager.get_user(999) is None
+
+    data_manager.add_user("Jane Doe")
+    assert len(data_manager.get_all_users()) == 2
+    jane = data_manager.get_user_by_name("Jane Doe").id
+    data_manager.add_movies(jane, MOVIES[:1])
+
+    uid = user_id(data_manager)
+    assert data_manager.delete_user(uid)
+    assert names(data_manager.get_all_users()) == ["Jane Doe"]
+    assert data_manager.get_user_movies(uid) == []
+    assert data_manager.get_user_stats(uid)['movie_count'] == 0
+    assert [(movie['imdb_id'], movie['owner_count']) for movie in
+            data_manager.get_popular_movies()] == [('tt0113277', 1)]
+    assert names(data_manager.get_user_movies(jane)) == ["Heat"]
+
+
+def test_reads_return_records(data_manager):
+    """
+    Tests that reads return immutable, detached records.
+    """
+    uid = user_id(data_manager)
+    assert isinstance(data_manager.get_user(uid), UserRecord)
+    assert all(isinstance(user, UserRecord)
+               for user in data_manager.get_all_users())
+    movies = data_manager.get_user_movies(uid)
+    assert names(movies) == [
+        "Heat", "The Godfather", "Collateral", "Apocalypse Now"]
+    assert all(isinstance(movie, MovieRecord) for movie in movies)
+    assert data_manager.get_movie(uid, movies[0].id) == movies[0]
+    with pytest.raises(AttributeError):
+        movies[0].rating = 1.0
+
+
+def test_find_user_movies_sort_and_paginate(data_manager):
+    """
+    Tests every sort option, stable ties and pagination.
+    """
+    uid = user_id(data_manager)
+    find = data_manager.find_user_movies
+    assert names(find(uid)) == [
+        "Apocalypse Now", "Collateral", "Heat", "The Godfather"]
+    assert names(find(uid, sort='name_desc', limit=2)) == [
+        "The Godfather", "Heat"]
+    assert names(find(uid, sort='year_asc', offset=1, limit=2)) == [
+        "Apocalypse Now", "Heat"]
+    assert names(find(uid, sort='year_desc')) == [
+        "Collateral", "Heat", "Apocalypse Now", "The Godfather"]
+    assert names(find(uid, sort='rating_asc')) == [
+        "Collateral", "Heat", "Apocalypse Now", "The Godfather"]
+    assert names(find(uid, sort='rating_desc')) == [
+        "The Godfather", "Heat", "Apocalypse Now", "Collateral"]
+
+
+def test_find_user_movies_search(data_manager):
+    """
+    Tests searching by title and director.
+    """
+    uid = user_id(data_manager)
+    assert names(data_manager.find_user_movies(uid, search='mann')) == [
+        "Collateral", "Heat"]
+    assert names(data_manager.find_user_movies(
+        uid, search='god', sort='year_desc')) == ["The Godfather"]
+    assert data_manager.find_user_movies(uid, search='100%') == []
+
+
+def test_movie_writes_and_stats(data_manager):
+    """
+    Tests updating and deleting movies and the derived statistics.
+    """
+    uid = user_id(data_manager)
+    heat = data_manager.find_user_movies(uid, search='heat')[0]
+    assert data_manager.get_movie(uid, heat.id).imdb_id == 'tt0113277'
+    assert data_manager.get_movie(uid + 1, heat.id) is None
+    assert data_manager.has_movie(uid, 'tt0000000', 'HEAT')
+
+    data_manager.update_movie(heat.id, rating=9.0)
+    godfather = data_manager.find_user_movies(uid, search='godfather')[0]
+    data_manager.delete_movie(godfather.id)
+
+    assert names(data_manager.find_user_movies(
+        uid, sort='rating_desc', limit=1)) == ["Heat"]
+    stats = data_manager.get_user_stats(uid)
+    assert stats['movie_count'] == 3
+    assert stats['average_rating'] == pytest.approx(8.65)
+    assert stats['decades'] == [(1970, 1), (1990, 1), (2000, 1)]
+    assert stats['top_directors'][0] == ('Michael Mann', 2)
+
+    assert [row[4] for row in data_manager.iter_user_movies(uid)] == [
+        'tt0113277', 'tt0369339', 'tt0078788']
+    assert data_manager.rebuild_stats() == 1
+    assert data_manager.get_user_stats(uid) == stats
+
+
+def test_sharded_collections_and_fan_out(tmp_path):
+    """
+    Tests that users land in different shards, movie IDs stay unique
+    and site-wide reads merge every shard.
+    """
+    manager = ShardedDataManager(tmp_path / "moviweb.db", shard_count=2)
+    for name in ("Ann", "Bob"):
+        manager.add_user(name)
+    ann = manager.get_user_by_name("Ann").id
+    bob = manager.get_user_by_name("Bob").id
+    assert manager.shard_index(ann) != manager.shard_index(bob)
+    assert (tmp_path / "moviweb.shard1.db").exists()
+
+    manager.add_movies(ann, MOVIES[:2])
+    manager.add_movies(bob, [dict(MOVIES[0], rating=7.3)])
+    ids = [movie.id for user in (ann, bob)
+           for movie in manager.get_user_movies(user)]
+    assert len(set(ids)) == 3
+    assert manager.get_movie(bob, ids[0]) is None
+
+    heat = manager.get_popular_movies('owners')[0]
+    assert (heat['imdb_id'], heat['owner_count']) == ('tt0113277', 2)
+    assert heat['average_rating'] == pytest.approx(7.8)
+    assert sorted(row[0] for row in manager.iter_ratings()) == [
+        ann, ann, bob]
+
+    manager.delete_movie(ids[2])
+    assert manager.get_popular_movies('owners')[0]['owner_count'] == 1
+    assert manager.rebuild_stats() == 1
+
+    # A deleted movie's ID is never handed out again
+    manager.add_movies(bob, [MOVIES[2]])
+    assert manager.get_user_movies(bob)[0].id != ids[2]
+
+    directory = set(inspect(manager.directory.engine).get_table_names())
+    shard = set(inspect(manager.shards[0].engine).get_table_names())
+    assert 'movies' not in directory and 'movie_plots' in directory
+    assert 'movie_plots' not in shard and 'catalog_titles' not in shard
+    assert 'movie_popularity' in shard
+
+
+def test_delete_user_on_legacy_schema(tmp_path):
+    """
+    Tests that deleting a user from a database created before ON DELETE
+    CASCADE existed leaves no movies for a user who reuses the ID.
+    """
+    path = tmp_path / "legacy.db"
+    with sqlite3.connect(path) as conn:
+        conn.executescript("""
+            CREATE TABLE users (id INTEGER PRIMARY KEY,
+                                name VARCHAR NOT NULL UNIQUE);
+            CREATE TABLE movies (id INTEGER PRIMARY KEY,
+                                 name VARCHAR NOT NULL,
+                                 director VARCHAR NOT NULL,
+                                 year INTEGER NOT NULL, rating FLOAT,
+                                 user_id INTEGER REFERENCES users (id),
+                                 imdb_id VARCHAR NOT NULL);
+            INSERT INTO users VALUES (1, 'John Doe');
+            INSERT INTO movies VALUES
+                (1, 'Heat', 'Michael Mann', 1995, 8.3, 1, 'tt0113277');
+        """)
+    conn.close()
+
+    manager = SQLiteDataManager(path)
+    assert manager.delete_user(1)
+    manager.add_user("Jane Doe")
+    jane = manager.get_user_by_name("Jane Doe").id
+    assert jane == 1
+    assert manager.get_user_movies(jane) == []
+    assert manager.get_popular_movies() == []
+    manager.engine.dispose()
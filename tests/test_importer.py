@@ -0,0 +1,181 @@
+import io
+from unittest.mock import patch
+import pytest
+from importer import CollectionImporter, iter_collection
+
+LETTERBOXD_CSV = (
+    "Date,Name,Year,Letterboxd URI,Rating\n"
+    "2024-01-01,The Godfather,1972,https://boxd.it/abc,4.5\n"
+    "2024-01-02,Heat,1995,https://boxd.it/def,\n"
+)
+
+IMDB_CSV = (
+    "Const,Your Rating,Title,Year,Directors\n"
+    "tt0068646,10,The Godfather,1972,Francis Ford Coppola\n"
+)
+
+
+class FakeDataManager:
+    """
+    Records bulk inserts instead of writing to a database.
+    """
+
+    def __init__(self, imdb_ids=(), titles=()):
+        self.keys = (set(imdb_ids), set(titles))
+        self.inserted = []
+        self.plots = {}
+
+    def get_movie_keys(self, user_id):
+        return set(self.keys[0]), set(self.keys[1])
+
+    def add_movies(self, user_id, movies):
+        self.inserted.append(list(movies))
+        return len(movies)
+
+    def save_plots(self, plots):
+        self.plots.update(plots)
+
+
+def mock_fetch_movies_by_id(imdb_ids, max_workers=8):
+    """
+    Mocks concurrent OMDb detail lookups.
+    """
+    details = {
+        "tt0068646": {"Title": "The Godfather", "Year": "1972",
+                      "Director": "Francis Ford Coppola",
+                      "imdbRating": "9.2"},
+        "tt0113277": {"Title": "Heat", "Year": "1995",
+                      "Director": "Michael Mann", "imdbRating": "8.3",
+                      "Plot": "A heist crew is tracked by a detective."},
+    }
+    return {i: details[i] for i in imdb_ids if i in details}
+
+
+def mock_make_api_request(query, by_id=False):
+    """
+    Mocks an OMDb title search.
+    """
+    return [{"Title": "Heat", "Year": "1986", "imdbID": "tt0091203"},
+            {"Title": "Heat", "Year": "1995", "imdbID": "tt0113277"},
+            {"Title": "The Godfather", "Year": "1972",
+             "imdbID": "tt0068646"}]
+
+
+def test_iter_collection_csv_formats():
+    """
+    Tests normalizing Letterboxd and IMDb CSV exports.
+    """
+    entries = list(iter_collection(io.StringIO(LETTERBOXD_CSV)))
+    assert entries[0].title == "The Godfather"
+    assert entries[0].year == 1972
+    assert entries[0].rating == 9.0
+    assert entries[1].rating is None
+
+    entry = next(iter_collection(io.StringIO(IMDB_CSV)))
+    assert entry.imdb_id == "tt0068646"
+    assert entry.rating == 10.0
+    assert entry.director == "Francis Ford Coppola"
+
+
+def test_iter_collection_json_formats():
+    """
+    Tests streaming JSON arrays and newline-delimited JSON.
+    """
+    array = io.StringIO('[{"imdb_id": "tt0068646"},\n'
+                        ' {"title": "Heat", "year": 1995}]')
+    ndjson = io.StringIO('{"imdb_id": "tt0068646"}\n\n'
+                         '{"title": "Heat", "year": 1995}\n')
+    for stream in (array, ndjson):
+        entries = list(iter_collection(stream, "json"))
+        assert [e.imdb_id for e in entries] == ["tt0068646", None]
+        assert entries[1].title == "Heat"
+
+
+def test_iter_collection_rejects_malformed_json_array():
+    """
+    Tests that a malformed array element stops the import with its
+    position instead of silently truncating the file.
+    """
+    stream = io.StringIO('[{"imdb_id": "tt0068646"}, {"title": Heat},'
+                         ' {"imdb_id": "tt0113277"}]')
+    entries = iter_collection(stream, "json")
+    assert next(entries).imdb_id == "tt0068646"
+    with pytest.raises(ValueError, match="element 2 at character 37"):
+        next(entries)
+
+
+@patch('importer.collection.make_api_request',
+       side_effect=mock_make_api_request)
+@patch('importer.collection.fetch_movies_by_id',
+       side_effect=mock_fetch_movies_by_id)
+def test_importer_resolves_and_deduplicates(mock_fetch, mock_search):
+    """
+    Tests resolving titles, skipping duplicates and batching writes.
+    """
+    data_manager = FakeDataManager(titles={"the godfather"})
+    rows = LETTERBOXD_CSV.split("\n", 1)[1]
+    entries = iter_collection(io.StringIO(LETTERBOXD_CSV + rows))
+    progress = []
+
+    result = CollectionImporter(data_manager, batch_size=2).run(
+        1, entries, progress=lambda r: progress.append(r.added))
+
+    assert result.processed == 4
+    assert result.added == 1
+    assert result.duplicates == 3
+    assert progress == [1, 1]
+    movie = data_manager.inserted[0][0]
+    assert movie['imdb_id'] == "tt0113277"
+    assert movie['director'] == "Michael Mann"
+    assert movie['rating'] == 8.3
+    assert list(data_manager.plots) == ["tt0113277"]
+    # Titles already in the collection are never looked up
+    assert mock_search.call_count == 1
+    assert mock_fetch.call_count == 1
+
+
+@patch('importer.collection.make_api_request',
+       side_effect=mock_make_api_request)
+@patch('importer.collection.fetch_movies_by_id',
+       side_effect=mock_fetch_movies_by_id)
+def test_importer_leaves_unmatched_titles_unresolved(mock_fetch,
+                                                     mock_search):
+    """
+    Tests that a title without a matching candidate is not imported
+    as an unrelated film.
+    """
+    data_manager = FakeDataManager()
+    entries = iter_collection(io.StringIO(
+        "Name,Year\nHeat,2001\nHeat Wave,1995\n"))
+
+    result = CollectionImporter(data_manager).run(1, entries)
+
+    assert result.unresolved == 2
+    assert result.added == 0
+
+
+@patch('importer.collection.make_api_request',
+       side_effect=mock_make_api_request)
+@patch('importer.collection.fetch_movies_by_id',
+       side_effect=mock_fetch_movies_by_id)
+def test_reimport_skips_lookups(mock_fetch, mock_search):
+    """
+    Tests that re-importing a collection sends no OMDb requests.
+    """
+    data_manager = FakeDataManager(imdb_ids={"tt0068646", "tt0113277"},
+                                   titles={"the godfather"})
+    entries = iter_collection(io.StringIO(
+        IMDB_CSV + "tt0113277,8,Heat,1995,Michael Mann\n"))
+
+    result = CollectionImporter(data_manager).run(1, entries)
+
+    assert result.duplicates == 2
+    assert mock_fetch.call_count == 0
+    assert mock_search.call_count == 0
+
+    # Titles resolving to a known ID are not fetched either
+    entries = iter_collection(io.StringIO("Name,Year\nHeat,1995\n"))
+    result = CollectionImporter(data_manager).run(1, entries)
+    assert result.duplicates == 1
+    assert mock_search.call_count == 1
+    assert mock_fetch.call_count == 0
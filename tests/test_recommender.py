@@ -0,0 +1,83 @@
+import pytest
+from recommender import TasteIndex, PeriodicSnapshot, \
+    build_taste_index
+
+RATINGS = [
+    (1, "tt0068646", "The Godfather", 9.2),
+    (1, "tt0071562", "The Godfather Part Ii", 9.0),
+    (1, "tt0113277", "Heat", 8.3),
+    (2, "tt0068646", "The Godfather", 9.2),
+    (2, "tt0071562", "The Godfather Part Ii", 9.0),
+    (2, "tt0099685", "Goodfellas", 8.7),
+    (3, "tt0110357", "The Lion King", 8.5),
+    (3, "tt0114709", "Toy Story", None),
+]
+
+
+class FakeDataManager:
+    """
+    Serves a fixed list of ratings.
+    """
+
+    def __init__(self, ratings):
+        self.ratings = ratings
+        self.calls = 0
+
+    def iter_ratings(self):
+        self.calls += 1
+        return iter(self.ratings)
+
+
+def test_build_taste_index():
+    """
+    Tests nearest neighbors and suggestions from overlapping users.
+    """
+    neighbors, recommendations = build_taste_index(RATINGS)
+
+    assert [user for user, _ in neighbors[1]] == [2]
+    assert 0 < neighbors[1][0][1] < 1
+    assert 3 not in neighbors
+
+    assert [imdb_id for imdb_id, _, _ in recommendations[1]] == [
+        "tt0099685"]
+    assert recommendations[2][0][:2] == ("tt0113277", "Heat")
+    assert 3 not in recommendations
+
+
+def test_build_taste_index_empty():
+    """
+    Tests building an index without any movies.
+    """
+    assert build_taste_index([]) == ({}, {})
+
+
+def test_taste_index_serves_precomputed_results():
+    """
+    Tests that lookups reuse the index until it is refreshed.
+    """
+    data_manager = FakeDataManager(RATINGS)
+    index = TasteIndex(data_manager)
+
+    assert index.similar_users(2)[0][0] == 1
+    assert index.recommend(3) == []
+    assert data_manager.calls == 1
+
+    data_manager.ratings = RATINGS + [(3, "tt0068646", "The Godfather",
+                                       9.2)]
+    assert index.recommend(3) == []
+    index.refresh()
+    assert data_manager.calls == 2
+    assert index.recommend(3)[0][0] in ("tt0071562", "tt0113277",
+                                        "tt0099685")
+
+
+def test_periodic_snapshot_requires_build():
+    """
+    Tests that a snapshot without build() fails when it is created,
+    not later in the background refresh thread.
+    """
+    class Incomplete(PeriodicSnapshot):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,2 @@
+from .compression import compress_response, choose_encoding
+from .assets import build_assets, load_manifest
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import mimetypes
+import os
+from web.compression import compress, is_compressible, brotli
+
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+
+
+def fingerprint(path):
+    """
+    Hash a file's contents.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        str: First HASH_LENGTH hex digits of its SHA-256.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(name, digest):
+    """
+    Insert a content hash before a file's extension.
+
+    Args:
+        name (str): Relative path such as 'styles.css'.
+        digest (str): Content hash.
+
+    Returns:
+        str: Path such as 'styles.1a2b3c4d5e6f.css'.
+    """
+    root, ext = os.path.splitext(name)
+    return f"{root}.{digest}{ext}"
+
+
+def build_assets(static_folder, output='dist', level=9):
+    """
+    Copy static files to content-hashed names and write a manifest.
+
+    Text assets are also written pre-compressed as '.gz' (and '.br'
+    when brotli is installed), so they can be served without
+    compressing on every request.
+
+    Args:
+        static_folder (str): The application's static folder.
+        output (str): Folder inside static_folder for the build.
+        level (int): Compression level for pre-compressed copies.
+
+    Returns:
+        dict: Manifest mapping original names to hashed names, both
+        relative to static_folder.
+    """
+    output_dir = os.path.join(static_folder, output)
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(output_dir):
+            dirs[:] = []
+            continue
+        dirs[:] = [d for d in dirs if os.path.abspath(
+            os.path.join(root, d)) != os.path.abspath(output_dir)]
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            relative = os.path.relpath(source, static_folder).replace(
+                os.sep, '/')
+            target = f"{output}/{hashed_name(relative, fingerprint(source))}"
+            manifest[relative] = target
+
+            target_path = os.path.join(static_folder, target)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            with open(source, 'rb') as f:
+                data = f.read()
+            with open(target_path, 'wb') as f:
+                f.write(data)
+
+            if is_compressible(mimetypes.guess_type(name)[0]):
+                encodings = ['gzip', 'br'] if brotli else ['gzip']
+                for encoding in encodings:
+                    suffix = '.gz' if encoding == 'gzip' else '.br'
+                    with open(target_path + suffix, 'wb') as f:
+                        f.write(compress(data, encoding, level))
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder, output='dist'):
+    """
+    Read the manifest written by build_assets().
+
+    Args:
+        static_folder (str): The application's static folder.
+        output (str): Folder inside static_folder for the build.
+
+    Returns:
+        dict: Original to hashed names; empty if assets were not
+        built.
+    """
+    try:
+        with open(os.path.join(static_folder, output,
+                               MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
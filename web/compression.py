@@ -0,0 +1,100 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/html', 'text/css', 'text/plain', 'text/csv',
+                      'application/json', 'application/x-ndjson',
+                      'application/javascript', 'image/svg+xml')
+
+
+def is_compressible(mimetype):
+    """
+    Check whether a content type is worth compressing.
+
+    Args:
+        mimetype (str): Content type without parameters.
+
+    Returns:
+        bool: True for text-like content.
+    """
+    return mimetype in COMPRESSIBLE_TYPES
+
+
+def choose_encoding(accept_encodings):
+    """
+    Pick the best content encoding the client accepts.
+
+    Args:
+        accept_encodings (Accept): The request's Accept-Encoding
+                                   header, as parsed by Werkzeug.
+
+    Returns:
+        str: 'br', 'gzip', or None for no compression.
+    """
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        return 'br'
+    if accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, level=6):
+    """
+    Compress data with the given encoding.
+
+    Args:
+        data (bytes): Uncompressed data.
+        encoding (str): 'br' or 'gzip'.
+        level (int): Compression level from 1 (fast) to 9 (small).
+
+    Returns:
+        bytes: Compressed data.
+    """
+    if encoding == 'br':
+        # Brotli qualities go up to 11; mid levels compress HTML
+        # better than gzip -9 at a similar speed
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_response(response, accept_encodings, min_size=500, level=6):
+    """
+    Compress a buffered response body in place.
+
+    Streamed and file responses, small bodies, non-text content and
+    responses that are already encoded are left untouched.
+
+    Args:
+        response (Response): Response about to be sent.
+        accept_encodings (Accept): The request's Accept-Encoding.
+        min_size (int): Smallest body in bytes worth compressing.
+        level (int): Compression level.
+
+    Returns:
+        Response: The same response.
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or not is_compressible(response.mimetype)):
+        return response
+
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding, level))
+    response.headers['Content-Encoding'] = encoding
+    if response.get_etag()[0]:
+        # The entity changed, so a strong validator no longer holds
+        response.set_etag(response.get_etag()[0], weak=True)
+    return response
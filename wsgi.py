@@ -0,0 +1,14 @@
+"""
+Production entry point.
+
+Run with: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import create_app
+
+app = create_app()
+
+# Open the databases once in the master process, so workers forked
+# from it start with the tables in place. Each worker then discards
+# the inherited connections and opens its own.
+with app.app_context():
+    app.extensions['moviweb'].load()